@@ -1,3 +1,7 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -12,6 +16,88 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+class PasswordHashBusy(Exception):
+    """Raised when the hashing pool already has max_pending jobs queued or running."""
+
+
+class PasswordHashPool:
+    """Dedicated, bounded executor for bcrypt checks on the login path.
+
+    bcrypt releases the GIL, so a small thread pool gives real parallelism
+    without occupying the threadpool that serves every other endpoint.
+    Submissions beyond ``max_pending`` are rejected immediately so a login
+    storm turns into fast 429s instead of an ever-growing queue.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _record(self, queue_wait: float, hash_time: float) -> None:
+        with self._lock:
+            self._completed += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._hash_time_total += hash_time
+            self._hash_time_max = max(self._hash_time_max, hash_time)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHashBusy()
+            self._pending += 1
+        enqueued_at = time.perf_counter()
+
+        def run() -> bool:
+            started_at = time.perf_counter()
+            try:
+                return verify_password(plain_password, hashed_password)
+            finally:
+                self._record(started_at - enqueued_at, time.perf_counter() - started_at)
+
+        future = self._executor.submit(run)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "queue_wait_avg_ms": round(1000 * self._queue_wait_total / completed, 3) if completed else 0.0,
+                "queue_wait_max_ms": round(1000 * self._queue_wait_max, 3),
+                "hash_time_avg_ms": round(1000 * self._hash_time_total / completed, 3) if completed else 0.0,
+                "hash_time_max_ms": round(1000 * self._hash_time_max, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+
 def get_password_hash(password: str) -> str:
     salt = bcrypt.gensalt(rounds=12)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
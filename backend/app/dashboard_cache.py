@@ -0,0 +1,165 @@
+"""Per-user cache of serialized GET /dashboard responses.
+
+An entry holds the JSON body and its ETag for one (user, role). It is only
+served for the same department and calendar day it was built for (the
+manager view depends on who is on leave today) and within
+``dashboard_cache_ttl_seconds``. Each entry is registered under the scopes
+its content depends on, and the domain event subscribers below evict exactly
+those scopes:
+
+* ``("user", id)``: the user's own leaves and dashboard config
+* ``("managers", department)``: a department's roster and leave
+* ``("hr",)``: organisation-wide counts, pending leaves and complaints
+
+Writes committed on other workers reach this cache only through the TTL.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from app.config import settings
+from app.dependencies import Principal
+from app.events import (
+    COMPLAINT_CHANGED,
+    COMPLIANCE_POLICY_CHANGED,
+    DASHBOARD_CONFIG_CHANGED,
+    LEARNING_CHANGED,
+    LEAVE_CHANGED,
+    USER_CHANGED,
+    subscribe,
+)
+from app.ttl_cache import TTLCache
+
+HR = ("hr",)
+
+
+def _user(user_id: int) -> tuple:
+    return ("user", user_id)
+
+
+def _managers(department: str) -> tuple:
+    return ("managers", department)
+
+
+@dataclass(frozen=True)
+class CachedDashboard:
+    body: bytes
+    etag: str
+    department: str
+    day: date
+
+
+def dashboard_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()[:24]}"'
+
+
+class DashboardCache(TTLCache):
+    """TTLCache of dashboard bodies keyed by (user id, role), with scope-based eviction."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        super().__init__(max_entries, ttl_seconds)
+        self._scopes: dict[tuple, set[tuple[int, str]]] = {}
+        self._key_scopes: dict[tuple[int, str], list[tuple]] = {}
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every eviction; pass it to ``put`` to drop results built before one."""
+        return self._generation
+
+    def get(self, principal: Principal) -> Optional[CachedDashboard]:
+        if not self.enabled:
+            return None
+        key = (principal.id, principal.role)
+        with self._lock:
+            entry = self._get(key)
+            if entry is None:
+                return None
+            if entry.day != date.today() or entry.department != principal.department:
+                self._drop(key)
+                return None
+            return entry
+
+    def put(self, principal: Principal, body: bytes, generation: int) -> CachedDashboard:
+        entry = CachedDashboard(
+            body=body,
+            etag=dashboard_etag(body),
+            department=principal.department,
+            day=date.today(),
+        )
+        if not self.enabled:
+            return entry
+        key = (principal.id, principal.role)
+        with self._lock:
+            if generation != self._generation:
+                # Something the body was built from changed while building it.
+                return entry
+            self._put(key, entry)
+            scopes = self._scopes_for(principal)
+            self._key_scopes[key] = scopes
+            for scope in scopes:
+                self._scopes.setdefault(scope, set()).add(key)
+        return entry
+
+    def evict(self, *scopes: tuple) -> None:
+        with self._lock:
+            self._generation += 1
+            for scope in scopes:
+                for key in list(self._scopes.get(scope, ())):
+                    self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+        super().clear()
+
+    def _evicted(self, key: tuple[int, str], value: CachedDashboard) -> None:
+        # Keep the scope sets to live entries only, whatever evicted this one.
+        for scope in self._key_scopes.pop(key, ()):
+            keys = self._scopes.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._scopes[scope]
+
+    @staticmethod
+    def _scopes_for(principal: Principal) -> list[tuple]:
+        scopes = [_user(principal.id)]
+        if principal.role == "manager":
+            scopes.append(_managers(principal.department))
+        elif principal.role == "hr":
+            scopes.append(HR)
+        return scopes
+
+
+dashboard_cache = DashboardCache(
+    max_entries=settings.dashboard_cache_max_entries,
+    ttl_seconds=settings.dashboard_cache_ttl_seconds,
+)
+
+
+@subscribe(LEAVE_CHANGED)
+def _on_leave_changed(employee_id: int, department: str, **_):
+    dashboard_cache.evict(_user(employee_id), _managers(department), HR)
+
+
+@subscribe(COMPLAINT_CHANGED)
+def _on_complaint_changed(employee_id: int, **_):
+    dashboard_cache.evict(HR)
+
+
+@subscribe(DASHBOARD_CONFIG_CHANGED)
+def _on_config_changed(user_id: int, **_):
+    dashboard_cache.evict(_user(user_id))
+
+
+@subscribe(COMPLIANCE_POLICY_CHANGED)
+@subscribe(LEARNING_CHANGED)
+def _on_hr_metrics_changed(**_):
+    dashboard_cache.evict(HR)
+
+
+@subscribe(USER_CHANGED)
+def _on_user_changed(user_id: int, departments: set, **_):
+    dashboard_cache.evict(_user(user_id), HR, *(_managers(d) for d in departments))
@@ -0,0 +1,88 @@
+"""Concurrent assembly of the GET /dashboard payload.
+
+A widget is an async provider that returns some DashboardData fields for the
+roles it serves, optionally gated by a DashboardConfig ``show_*`` flag.
+``compose`` runs the caller's enabled widgets concurrently, each on its own
+AsyncSession because a session must not be shared between tasks, and at most
+``max_concurrency`` at a time so one request does not take a large share of
+the connection pool. Disabled widgets never run. ``recommendations`` dicts
+from several widgets are merged in registration order. Per-widget query
+times come back for the Server-Timing header, with the time spent waiting
+for and checking out connections reported separately as ``db-connect``.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.dependencies import Principal
+from app.schemas import DashboardConfigResponse, DashboardData
+
+Provider = Callable[[Principal, AsyncSession], Awaitable[dict]]
+
+
+@dataclass(frozen=True)
+class Widget:
+    name: str
+    roles: frozenset
+    provider: Provider
+    flag: Optional[str] = None  # DashboardConfig field that turns the widget off
+
+
+class DashboardComposer:
+    def __init__(self, session_factory=AsyncSessionLocal, max_concurrency: int = settings.dashboard_widget_concurrency):
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.widgets: list[Widget] = []
+
+    def widget(self, name: str, roles: Iterable[str], flag: Optional[str] = None):
+        """Decorator registering ``provider`` as widget ``name``."""
+        def register(provider: Provider) -> Provider:
+            self.widgets.append(Widget(name, frozenset(roles), provider, flag))
+            return provider
+        return register
+
+    def enabled(self, principal: Principal, config: DashboardConfigResponse) -> list[Widget]:
+        return [
+            widget for widget in self.widgets
+            if principal.role in widget.roles and (widget.flag is None or getattr(config, widget.flag))
+        ]
+
+    async def compose(
+        self, principal: Principal, config: DashboardConfigResponse
+    ) -> tuple[DashboardData, dict[str, float]]:
+        """Run the enabled widgets; returns the payload and milliseconds per widget."""
+        widgets = self.enabled(principal, config)
+        slots = asyncio.Semaphore(max(self.max_concurrency, 1))
+        results = await asyncio.gather(*(self._run(widget, principal, slots) for widget in widgets))
+        data = DashboardData(config=config)
+        timings = {"db-connect": 0.0}
+        for widget, (fields, connect_ms, elapsed_ms) in zip(widgets, results):
+            timings["db-connect"] += connect_ms
+            timings[widget.name] = elapsed_ms
+            for key, value in fields.items():
+                if key == "recommendations":
+                    data.recommendations.update(value)
+                else:
+                    setattr(data, key, value)
+        return data, timings
+
+    async def _run(
+        self, widget: Widget, principal: Principal, slots: asyncio.Semaphore
+    ) -> tuple[dict, float, float]:
+        """``(fields, connect ms, query ms)`` for one widget."""
+        start = time.perf_counter()
+        async with slots, self.session_factory() as db:
+            await db.connection()
+            connected = time.perf_counter()
+            fields = await widget.provider(principal, db)
+        return fields, (connected - start) * 1000, (time.perf_counter() - connected) * 1000
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """``Server-Timing`` header value for millisecond ``timings``."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
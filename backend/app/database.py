@@ -1,19 +1,146 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from app.config import settings
 
-engine = create_engine(
-    settings.database_url, connect_args={"check_same_thread": False}
-)
+
+def sqlite_pragmas() -> dict:
+    """PRAGMAs applied to every new SQLite connection, from Settings."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def configure_sqlite(engine: Engine, pragmas: dict) -> None:
+    """Apply ``pragmas`` on each DBAPI connect for a SQLite engine.
+
+    journal_mode=WAL lets readers proceed while a writer holds the lock, and
+    busy_timeout makes writers wait for the lock instead of failing straight
+    away with "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value is None or value == "":
+                    continue
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+# Every backend the app runs on; each has an asyncio driver and an
+# INSERT ... ON CONFLICT construct (see dialect_insert).
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def check_supported_database(url: str) -> None:
+    """Fail at engine creation, not at the first upsert, on an unsupported backend."""
+    backend = make_url(url).get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(
+            f"Unsupported database {backend!r} in DATABASE_URL; use one of: {', '.join(_ASYNC_DRIVERS)}"
+        )
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto the matching asyncio driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS and parsed.get_driver_name() != _ASYNC_DRIVERS[backend]:
+        parsed = parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _engine_options(url: str) -> dict:
+    """Dialect-specific create_engine() keyword arguments."""
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite connections are cheap and file-local; SQLAlchemy's default
+        # pool for file databases is fine, it just needs cross-thread use.
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def create_app_engine(url: str) -> Engine:
+    """Build the sync engine for ``url`` (SQLite or a pooled server database)."""
+    check_supported_database(url)
+    new_engine = create_engine(url, **_engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        configure_sqlite(new_engine, sqlite_pragmas())
+    return new_engine
+
+
+def create_app_async_engine(url: str) -> AsyncEngine:
+    """Async counterpart of create_app_engine, using aiosqlite/asyncpg."""
+    check_supported_database(url)
+    options = _engine_options(url)
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory":
+            # Each in-memory connection is its own database; do not pool them.
+            options = {"poolclass": NullPool}
+        else:
+            # Without a pool every AsyncSession would start an aiosqlite
+            # thread, connect and re-run the PRAGMAs (several ms each).
+            options = {
+                "poolclass": AsyncAdaptedQueuePool,
+                "pool_size": settings.sqlite_async_pool_size,
+                "max_overflow": 0,
+                "pool_timeout": settings.db_pool_timeout,
+            }
+    new_engine = create_async_engine(async_database_url(url), **options)
+    if new_engine.dialect.name == "sqlite":
+        configure_sqlite(new_engine.sync_engine, sqlite_pragmas())
+    return new_engine
+
+
+engine = create_app_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by async handlers so a DB round trip does not pin a threadpool thread.
+async_engine = create_app_async_engine(settings.database_url)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+def dialect_insert(db):
+    """insert() construct for the session's dialect, with on_conflict_do_update.
+
+    The engine factories only accept SQLite and PostgreSQL, which both have one.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,24 +1,34 @@
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db, get_db
 from app.models import User
 from app.auth import decode_token
+from app.identity_cache import current_token_version, current_token_version_async, load_user, load_user_async
 
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+@dataclass(frozen=True)
+class Principal:
+    """Who is calling, as far as authorization is concerned."""
+    id: int
+    role: str
+    department: str
+
+
+def _decode_credentials(credentials: Optional[HTTPAuthorizationCredentials]) -> tuple[int, dict]:
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     token = credentials.credentials
     payload = decode_token(token)
     if payload is None:
@@ -42,7 +52,10 @@ def get_current_user(
             detail="Invalid token format",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.query(User).filter(User.id == user_id).first()
+    return user_id, payload
+
+
+def _user_or_401(user: Optional[User]) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,21 +65,121 @@ def get_current_user(
     return user
 
 
+def _load_user_or_401(db: Session, user_id: int) -> User:
+    return _user_or_401(load_user(db, user_id))
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    user_id, _ = _decode_credentials(credentials)
+    return _load_user_or_401(db, user_id)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user for async handlers; the lookup uses the request's AsyncSession."""
+    user_id, _ = _decode_credentials(credentials)
+    return _user_or_401(await load_user_async(db, user_id))
+
+
+def _claims(payload: dict) -> Optional[tuple[str, str, int]]:
+    role = payload.get("role")
+    department = payload.get("department")
+    version = payload.get("ver")
+    if role is None or department is None or version is None:
+        # Token predates claims-based auth; fall back to the user row.
+        return None
+    return role, department, version
+
+
+def _check_token_version(version: int, current_version: Optional[int]) -> None:
+    if current_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if version != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def _principal_from_claims(db: Session, user_id: int, payload: dict) -> Optional[Principal]:
+    claims = _claims(payload)
+    if claims is None:
+        return None
+    role, department, version = claims
+    _check_token_version(version, current_token_version(db, user_id))
+    return Principal(id=user_id, role=role, department=department)
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Resolve the caller's id/role/department.
+
+    With ``settings.trusted_claims`` enabled these come straight from the
+    verified token, checked only against the per-user token version, so the
+    users row is never loaded. Otherwise they are read from the user record.
+    """
+    user_id, payload = _decode_credentials(credentials)
+    if settings.trusted_claims:
+        principal = _principal_from_claims(db, user_id, payload)
+        if principal is not None:
+            return principal
+    user = _load_user_or_401(db, user_id)
+    return Principal(id=user.id, role=user.role, department=user.department)
+
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """get_current_principal for async handlers, without a threadpool hop or sync connection."""
+    user_id, payload = _decode_credentials(credentials)
+    if settings.trusted_claims:
+        claims = _claims(payload)
+        if claims is not None:
+            role, department, version = claims
+            _check_token_version(version, await current_token_version_async(db, user_id))
+            return Principal(id=user_id, role=role, department=department)
+    user = _user_or_401(await load_user_async(db, user_id))
+    return Principal(id=user.id, role=user.role, department=user.department)
+
+
+def _require(current_user: Principal, required_role: str) -> Principal:
+    if current_user.role != required_role:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Access denied. Required role: {required_role}"
+        )
+    return current_user
+
+
 def require_role(required_role: str):
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
-        if current_user.role != required_role:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Required role: {required_role}"
-            )
-        return current_user
+    def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
+        return _require(current_user, required_role)
+    return role_checker
+
+
+def require_role_async(required_role: str):
+    """require_role for async handlers (resolves the caller with get_current_principal_async)."""
+    async def role_checker(current_user: Principal = Depends(get_current_principal_async)) -> Principal:
+        return _require(current_user, required_role)
     return role_checker
 
 
 def require_manager_department(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> User:
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     if current_user.role != "manager":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,100 @@
+"""In-process domain events.
+
+Handlers subscribe to an event name and are called synchronously by
+``publish`` with the event's keyword payload. Writes made through the ORM are
+turned into events by the mapper listeners at the bottom of this module and
+published only once their transaction commits, so subscribers never act on a
+change that was rolled back. Code that writes with bulk statements (which
+bypass mapper events) publishes explicitly after committing.
+
+Events are not shared between workers; subscribers that cache data must also
+expire it on their own.
+"""
+import logging
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Complaint,
+    CompliancePolicy,
+    DashboardConfig,
+    LearningContent,
+    LeaveRequest,
+    User,
+    UserLearningProgress,
+)
+
+logger = logging.getLogger(__name__)
+
+LEAVE_CHANGED = "leave_changed"  # employee_id, department
+COMPLAINT_CHANGED = "complaint_changed"  # employee_id
+DASHBOARD_CONFIG_CHANGED = "dashboard_config_changed"  # user_id
+COMPLIANCE_POLICY_CHANGED = "compliance_policy_changed"  # department
+LEARNING_CHANGED = "learning_changed"  # user_id (None for catalog changes)
+USER_CHANGED = "user_changed"  # user_id, role, departments (old and new)
+
+_PENDING_KEY = "domain_events"
+
+_handlers: dict[str, list[Callable]] = defaultdict(list)
+
+
+def subscribe(name: str):
+    """Decorator registering a handler for event ``name``."""
+    def register(handler: Callable) -> Callable:
+        _handlers[name].append(handler)
+        return handler
+    return register
+
+
+def publish(name: str, **payload) -> None:
+    for handler in _handlers.get(name, ()):
+        try:
+            handler(**payload)
+        except Exception:
+            # A failing subscriber must not fail the write that raised the event.
+            logger.exception("Handler %s for event %s failed", handler.__qualname__, name)
+
+
+def publish_on_commit(session: Session, name: str, **payload) -> None:
+    """Queue an event on ``session``, published if and when it commits."""
+    session.info.setdefault(_PENDING_KEY, []).append((name, payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for name, payload in session.info.pop(_PENDING_KEY, ()):
+        publish(name, **payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _on_write(model, build: Callable[[object], tuple[str, dict]]) -> None:
+    def queue(mapper, connection, target):
+        session = Session.object_session(target)
+        if session is not None:
+            name, payload = build(target)
+            publish_on_commit(session, name, **payload)
+    for kind in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, kind, queue)
+
+
+def _user_changed(user: User) -> tuple[str, dict]:
+    # A department move affects both the old and the new team.
+    history = inspect(user).attrs.department.history
+    departments = {user.department, *(history.deleted or ())}
+    return USER_CHANGED, {"user_id": user.id, "role": user.role, "departments": departments}
+
+
+_on_write(LeaveRequest, lambda l: (LEAVE_CHANGED, {"employee_id": l.employee_id, "department": l.department}))
+_on_write(Complaint, lambda c: (COMPLAINT_CHANGED, {"employee_id": c.employee_id}))
+_on_write(DashboardConfig, lambda c: (DASHBOARD_CONFIG_CHANGED, {"user_id": c.user_id}))
+_on_write(CompliancePolicy, lambda p: (COMPLIANCE_POLICY_CHANGED, {"department": p.department}))
+_on_write(LearningContent, lambda c: (LEARNING_CHANGED, {"user_id": None}))
+_on_write(UserLearningProgress, lambda p: (LEARNING_CHANGED, {"user_id": p.user_id}))
+_on_write(User, _user_changed)
@@ -0,0 +1,122 @@
+"""In-process identity cache used by get_current_user.
+
+Entries are plain column snapshots keyed by user id, so nothing bound to a
+closed session outlives its request. A hit is re-attached to the caller's
+session with ``merge(load=False)``, which issues no SELECT. Any ORM update or
+delete of a User (profile edits, role/department changes, account removal)
+evicts the entry, both at flush time and again once the transaction commits.
+
+The module also tracks each user's ``token_version``, which is bumped whenever
+role or department changes and lets claims-based authorization reject tokens
+minted before the change without loading the user row.
+"""
+from typing import Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+from app.ttl_cache import TTLCache
+
+# password_hash is left out on purpose; it lazy-loads on the paths that need it.
+_CACHED_ATTRS = [
+    attr.key for attr in User.__mapper__.column_attrs if attr.key != "password_hash"
+]
+_DIRTY_KEY = "identity_cache_dirty"
+
+identity_cache = TTLCache(
+    max_entries=settings.identity_cache_max_entries,
+    ttl_seconds=settings.identity_cache_ttl_seconds,
+)
+token_version_cache = TTLCache(
+    max_entries=settings.identity_cache_max_entries,
+    ttl_seconds=settings.token_version_ttl_seconds,
+)
+
+
+def _snapshot(user: User) -> dict:
+    return {key: getattr(user, key) for key in _CACHED_ATTRS}
+
+
+def load_user(db: Session, user_id: int) -> Optional[User]:
+    """Return the User for ``user_id`` bound to ``db``, serving from cache when possible."""
+    values = identity_cache.get(user_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        identity_cache.put(user_id, _snapshot(user))
+    return user
+
+
+async def load_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    """load_user for async handlers, so a cache miss does not need a sync connection."""
+    values = identity_cache.get(user_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    user = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
+    if user is not None:
+        identity_cache.put(user_id, _snapshot(user))
+    return user
+
+
+def current_token_version(db: Session, user_id: int) -> Optional[int]:
+    """Return the user's token version, or None if the user no longer exists."""
+    version = token_version_cache.get(user_id)
+    if version is not None:
+        return version
+    row = db.query(User.token_version).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    version = row.token_version or 0
+    token_version_cache.put(user_id, version)
+    return version
+
+
+async def current_token_version_async(db: AsyncSession, user_id: int) -> Optional[int]:
+    version = token_version_cache.get(user_id)
+    if version is not None:
+        return version
+    row = (await db.execute(select(User.token_version).filter(User.id == user_id))).first()
+    if row is None:
+        return None
+    version = row.token_version or 0
+    token_version_cache.put(user_id, version)
+    return version
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.department.history.has_changes():
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_on_write(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+    token_version_cache.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_DIRTY_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session):
+    # A concurrent request may have re-cached the pre-commit row between the
+    # flush and the commit, so evict once more when the write is durable.
+    for user_id in session.info.pop(_DIRTY_KEY, ()):
+        identity_cache.invalidate(user_id)
+        token_version_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty(session):
+    session.info.pop(_DIRTY_KEY, None)
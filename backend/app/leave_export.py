@@ -0,0 +1,183 @@
+"""iCalendar and CSV export of a department's leave.
+
+Rows are read with ``stream_results``/``yield_per`` and rendered batch by
+batch, so an export is sent as it is produced and never held in memory as a
+whole. ``calendar_validators`` gives the ETag and Last-Modified for a
+conditional GET from one aggregate over the department's leaves (index
+ix_leave_requests_department_updated_at), without reading the rows.
+"""
+import csv
+import hashlib
+import io
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import LeaveRequest, User
+
+# Rows fetched and rendered per chunk of the response body.
+EXPORT_BATCH = 500
+
+CSV_COLUMNS = [
+    "leave_id", "employee_id", "employee_name", "from_date", "to_date", "status", "reason", "updated_at",
+]
+
+_ICS_STATUS = {"Approved": "CONFIRMED", "Pending": "TENTATIVE", "Rejected": "CANCELLED"}
+
+
+def export_query(department: str, start_date: date, end_date: date):
+    return (
+        select(
+            LeaveRequest.id, LeaveRequest.employee_id, User.name.label("employee_name"),
+            LeaveRequest.from_date, LeaveRequest.to_date, LeaveRequest.status,
+            LeaveRequest.reason, LeaveRequest.updated_at, LeaveRequest.version,
+        )
+        .join(User, LeaveRequest.employee_id == User.id)
+        .where(
+            LeaveRequest.department == department,
+            LeaveRequest.from_date <= end_date,
+            LeaveRequest.to_date >= start_date,
+        )
+        .order_by(LeaveRequest.from_date, LeaveRequest.id)
+    )
+
+
+def calendar_validators(db: Session, key: str, department: str) -> tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified for an export of ``department``.
+
+    ``key`` identifies the representation (format and date window). The row
+    count and highest id are part of the ETag so that deleting a leave, which
+    leaves no updated_at behind, still changes it; Last-Modified only moves on
+    inserts and updates, so clients should prefer If-None-Match.
+    """
+    count, last_id, last_change = db.execute(
+        select(func.count(), func.max(LeaveRequest.id), func.max(LeaveRequest.updated_at))
+        .where(LeaveRequest.department == department)
+    ).one()
+    digest = hashlib.sha1(f"{key}|{department}|{count}|{last_id}|{last_change}".encode()).hexdigest()
+    return f'"{digest[:24]}"', last_change
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def not_modified(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent (RFC 9110)."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    since = headers.get("if-modified-since")
+    if not since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def stream_rows(query, render, header: str = "", footer: str = "") -> Iterator[str]:
+    """Yield ``header``, then ``render(rows)`` per batch of ``query``, then ``footer``.
+
+    The generator opens its own Session: it runs while the response is being
+    sent, after the request's dependencies may already have been closed.
+    """
+    db = SessionLocal()
+    try:
+        if header:
+            yield header
+        result = db.execute(query.execution_options(stream_results=True, yield_per=EXPORT_BATCH))
+        for rows in result.partitions():
+            yield render(rows)
+        if footer:
+            yield footer
+    finally:
+        db.close()
+
+
+def render_csv_header() -> str:
+    return _csv_lines([CSV_COLUMNS])
+
+
+def render_csv(rows) -> str:
+    return _csv_lines(
+        [row.id, row.employee_id, row.employee_name, row.from_date.isoformat(), row.to_date.isoformat(),
+         row.status, row.reason, row.updated_at.isoformat() if row.updated_at else ""]
+        for row in rows
+    )
+
+
+def _csv_lines(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ics_header(department: str) -> str:
+    return _ics_lines([
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//WorkHub//Team leave//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_ics_text(f'{department} leave')}",
+    ])
+
+
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+
+def render_ics(rows) -> str:
+    lines = []
+    for row in rows:
+        stamp = (row.updated_at or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:leave-{row.id}@workhub",
+            f"DTSTAMP:{stamp}",
+            f"LAST-MODIFIED:{stamp}",
+            f"SEQUENCE:{max((row.version or 1) - 1, 0)}",
+            f"DTSTART;VALUE=DATE:{row.from_date.strftime('%Y%m%d')}",
+            # DTEND is exclusive for all-day events.
+            f"DTEND;VALUE=DATE:{(row.to_date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{_ics_text(f'{row.employee_name} on leave ({row.status})')}",
+            f"DESCRIPTION:{_ics_text(row.reason or '')}",
+            f"STATUS:{_ICS_STATUS.get(row.status, 'TENTATIVE')}",
+            "TRANSP:TRANSPARENT",
+            "END:VEVENT",
+        ]
+    return _ics_lines(lines)
+
+
+def _ics_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _ics_lines(lines) -> str:
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def _fold(line: str) -> str:
+    """Fold a content line to at most 75 octets per physical line (RFC 5545 3.1)."""
+    if len(line.encode()) <= 75:
+        return line
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            # Continuation lines start with a space, which counts towards 75.
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts)
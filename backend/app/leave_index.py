@@ -0,0 +1,191 @@
+"""Per-department interval index of open leave, for conflict checks at apply time.
+
+Each department's Pending and Approved leaves are kept in memory as a list
+sorted by start day, together with the longest leave seen. Every leave that
+overlaps ``[a, b]`` starts in ``[a - longest, b]``, so a lookup is two
+bisections plus a pass over that slice, instead of a query against
+leave_requests on every submit.
+
+A department is loaded on first use. ORM inserts, updates and deletes of
+LeaveRequest are applied to loaded departments once their transaction
+commits; bulk UPDATEs (the auto-approval job) call ``invalidate`` instead.
+A department's member names are reloaded on the USER_CHANGED event, which
+covers users being added, removed, renamed or moved between departments.
+Other workers pick up changes after ``leave_index_ttl_seconds``.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.events import USER_CHANGED, subscribe
+from app.models import LeaveRequest, User
+
+OPEN_STATUSES = ("Pending", "Approved")
+
+_CHANGES_KEY = "leave_index_changes"
+
+
+class IndexedLeave(NamedTuple):
+    from_day: int
+    to_day: int
+    leave_id: int
+    employee_id: int
+    status: str
+
+    @property
+    def from_date(self) -> date:
+        return date.fromordinal(self.from_day)
+
+    @property
+    def to_date(self) -> date:
+        return date.fromordinal(self.to_day)
+
+
+@dataclass
+class _Department:
+    starts: list[int] = field(default_factory=list)
+    leaves: list[IndexedLeave] = field(default_factory=list)
+    by_id: dict[int, IndexedLeave] = field(default_factory=dict)
+    longest: int = 0
+    members: dict[int, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+    def add(self, leave: IndexedLeave) -> None:
+        i = bisect_right(self.starts, leave.from_day)
+        self.starts.insert(i, leave.from_day)
+        self.leaves.insert(i, leave)
+        self.by_id[leave.leave_id] = leave
+        self.longest = max(self.longest, leave.to_day - leave.from_day)
+
+    def remove(self, leave_id: int) -> None:
+        leave = self.by_id.pop(leave_id, None)
+        if leave is None:
+            return
+        i = bisect_left(self.starts, leave.from_day)
+        while self.leaves[i].leave_id != leave_id:
+            i += 1
+        del self.starts[i]
+        del self.leaves[i]
+
+    def overlapping(self, from_day: int, to_day: int) -> list[IndexedLeave]:
+        lo = bisect_left(self.starts, from_day - self.longest)
+        hi = bisect_right(self.starts, to_day)
+        return [leave for leave in self.leaves[lo:hi] if leave.to_day >= from_day]
+
+
+def _indexed(leave) -> IndexedLeave:
+    return IndexedLeave(
+        leave.from_date.toordinal(), leave.to_date.toordinal(), leave.id, leave.employee_id, leave.status
+    )
+
+
+class LeaveIndex:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._departments: dict[str, _Department] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, departments: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if departments is None:
+                self._departments.clear()
+            for department in departments or ():
+                self._departments.pop(department, None)
+
+    def _load(self, db: Session, department: str) -> _Department:
+        with self._lock:
+            index = self._departments.get(department)
+            if index is not None and index.expires_at > time.monotonic():
+                return index
+            generation = self._generation
+        index = _Department(members=dict(db.execute(
+            select(User.id, User.name).where(User.department == department)
+        ).all()))
+        rows = db.execute(
+            select(LeaveRequest.id, LeaveRequest.employee_id, LeaveRequest.from_date,
+                   LeaveRequest.to_date, LeaveRequest.status)
+            .where(LeaveRequest.department == department, LeaveRequest.status.in_(OPEN_STATUSES))
+            .order_by(LeaveRequest.from_date)
+        ).all()
+        for row in rows:
+            leave = _indexed(row)
+            index.starts.append(leave.from_day)
+            index.leaves.append(leave)
+            index.by_id[leave.leave_id] = leave
+            index.longest = max(index.longest, leave.to_day - leave.from_day)
+        with self._lock:
+            # A change committed while we were reading may be missing from
+            # ``rows``; keep the result for this lookup but reload next time.
+            fresh = generation == self._generation
+            index.expires_at = time.monotonic() + self.ttl_seconds if fresh else 0.0
+            self._departments[department] = index
+        return index
+
+    def overlapping(self, db: Session, department: str, from_date: date, to_date: date) -> list[IndexedLeave]:
+        """Open leaves in ``department`` covering any day of ``[from_date, to_date]``."""
+        index = self._load(db, department)
+        with self._lock:
+            return index.overlapping(from_date.toordinal(), to_date.toordinal())
+
+    def members(self, db: Session, department: str) -> dict[int, str]:
+        """Names of the department's users, keyed by user id."""
+        return self._load(db, department).members
+
+    def _apply(self, changes: list) -> None:
+        with self._lock:
+            self._generation += 1
+            for department, leave_id, leave in changes:
+                index = self._departments.get(department)
+                if index is None:
+                    continue
+                index.remove(leave_id)
+                if leave is not None:
+                    index.add(leave)
+
+
+leave_index = LeaveIndex(ttl_seconds=settings.leave_index_ttl_seconds)
+
+
+def _record(target, deleted: bool) -> None:
+    session = Session.object_session(target)
+    if session is None:
+        return
+    leave = None if deleted or target.status not in OPEN_STATUSES else _indexed(target)
+    session.info.setdefault(_CHANGES_KEY, []).append((target.department, target.id, leave))
+
+
+@event.listens_for(LeaveRequest, "after_insert")
+@event.listens_for(LeaveRequest, "after_update")
+def _record_write(mapper, connection, target):
+    _record(target, deleted=False)
+
+
+@event.listens_for(LeaveRequest, "after_delete")
+def _record_delete(mapper, connection, target):
+    _record(target, deleted=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        leave_index._apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+@subscribe(USER_CHANGED)
+def _on_user_changed(departments: set, **_):
+    leave_index.invalidate(departments)
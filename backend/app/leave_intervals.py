@@ -0,0 +1,92 @@
+"""Day-indexed interval arithmetic for leave calendars.
+
+Leaves are closed ``[from_date, to_date]`` intervals. They are mapped to
+integer day numbers and counted with a difference array: +1 on each start day,
+-1 on the day after each end, and a cumulative sum gives how many leaves cover
+every day. All steps are vectorized NumPy, so a window costs O(n + days)
+rather than one Python iteration per leave-day.
+"""
+from datetime import date
+from typing import Iterable
+
+import numpy as np
+
+from app.config import settings
+
+
+def to_days(dates: Iterable[date]) -> np.ndarray:
+    """Dates as int64 day numbers (days since 1970-01-01)."""
+    return np.asarray(list(dates), dtype="datetime64[D]").astype(np.int64)
+
+
+def from_day(day: int) -> date:
+    return np.datetime64(int(day), "D").astype(date)
+
+
+def daily_headcount(starts: np.ndarray, ends: np.ndarray, length: int) -> np.ndarray:
+    """Number of intervals covering each day ``0 .. length - 1``.
+
+    ``starts`` and ``ends`` are inclusive day offsets from the window origin;
+    intervals reaching outside the window are clipped to it.
+    """
+    groups = np.zeros(len(starts), dtype=np.int64)
+    return daily_headcount_by_group(groups, starts, ends, 1, length)[0]
+
+
+def daily_headcount_by_group(
+    groups: np.ndarray, starts: np.ndarray, ends: np.ndarray, n_groups: int, length: int
+) -> np.ndarray:
+    """Per-group daily_headcount as an ``(n_groups, length)`` array, in one pass.
+
+    Each group gets its own row of the difference array, laid out end to end
+    so a single bincount covers all of them.
+    """
+    width = length + 1
+    lo = np.clip(starts, 0, length)
+    hi = np.clip(ends + 1, 0, length)
+    inside = lo < hi
+    base = groups[inside] * width
+    diff = (np.bincount(base + lo[inside], minlength=n_groups * width)
+            - np.bincount(base + hi[inside], minlength=n_groups * width))
+    return np.cumsum(diff.reshape(n_groups, width)[:, :length], axis=1)
+
+
+def merge_overlapping(keys: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    """Union overlapping intervals that share a key.
+
+    Used with one key per person so that someone with overlapping requests is
+    counted once per day. Returns ``(keys, starts, ends)`` of the merged
+    intervals.
+    """
+    if len(keys) == 0:
+        return keys, starts, ends
+    order = np.lexsort((starts, keys))
+    keys, starts, ends = keys[order], starts[order], ends[order]
+    # Shift each key's ends into its own range so one running maximum never
+    # carries across keys.
+    rank = np.unique(keys, return_inverse=True)[1]
+    offset = rank * (int(ends.max() - starts.min()) + 2)
+    reach = np.maximum.accumulate(ends + offset) - offset
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = (keys[1:] != keys[:-1]) | (starts[1:] > reach[:-1])
+    last = np.append(np.flatnonzero(first)[1:] - 1, len(keys) - 1)
+    return keys[first], starts[first], reach[last]
+
+
+def runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    """Inclusive ``(start, end)`` offsets of each run of True in ``mask``."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), (np.flatnonzero(edges == -1) - 1).tolist()))
+
+
+def intervals_touching(mask: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """For each interval, whether any day it covers is set in the boolean ``mask``."""
+    hits = np.concatenate(([0], np.cumsum(mask)))
+    lo = np.clip(starts, 0, len(mask))
+    hi = np.clip(ends + 1, 0, len(mask))
+    return hits[hi] - hits[lo] > 0
+
+
+def conflict_threshold(department: str) -> int:
+    """Headcount on leave at which a day counts as a conflict for ``department``."""
+    return settings.leave_conflict_thresholds.get(department, settings.leave_conflict_threshold)
@@ -0,0 +1,133 @@
+"""Append-only leave ledger.
+
+Balance changes are inserted as LeaveLedgerEntry rows and never updated;
+each approved leave appends a debit of its working days. Leaves can only be
+deleted or decided while Pending, so nothing is ever given back, and the
+yearly allowance is the fixed DEFAULT_ALLOWANCE. LeaveBalance rows are
+snapshots that fold in every entry up to their ``snapshot_ledger_id``; the
+snapshot_balances job advances them periodically. A current balance is
+therefore the snapshot (or the default allowance when there is none) plus the
+entries after it, so approvals never update a shared balance row and reads
+never replay more than the tail since the last snapshot.
+"""
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import Integer, and_, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import LeaveBalance, LeaveLedgerEntry, User
+from app.working_days import working_days
+
+DEBIT = "debit"
+
+DEFAULT_ALLOWANCE = 20
+
+# Rows per multi-row INSERT, well under SQLite's bound-parameter limit.
+_UPSERT_BATCH = 500
+
+
+def debit_leaves(db: Session, leaves: Sequence, year: int) -> list[int]:
+    """Append a debit entry for each approved leave and return the days debited.
+
+    Days are working days by the leave's department calendar. ``leaves`` may
+    be LeaveRequest objects or rows with ``id``, ``employee_id``,
+    ``department``, ``from_date`` and ``to_date``. Does not commit.
+    """
+    if not leaves:
+        return []
+    days = working_days.count(
+        db,
+        [leave.department for leave in leaves],
+        [leave.from_date for leave in leaves],
+        [leave.to_date for leave in leaves],
+    ).tolist()
+    now = datetime.utcnow()
+    db.execute(insert(LeaveLedgerEntry), [
+        {"user_id": leave.employee_id, "year": year, "kind": DEBIT,
+         "days": n, "leave_id": leave.id, "created_at": now}
+        for leave, n in zip(leaves, days)
+    ])
+    return days
+
+
+def _used(entry=LeaveLedgerEntry):
+    # Every entry is a debit; ``kind`` is kept on the rows for audits.
+    return func.coalesce(func.sum(entry.days), 0)
+
+
+def balances_query(year: int, *criteria):
+    """Current ``year`` balance for every User matching ``criteria``.
+
+    Rows have the LeaveBalanceResponse fields and are ordered by user id. Each
+    user's ledger tail is summed by an index seek on (user_id, year, id).
+    """
+    after_snapshot = and_(
+        LeaveLedgerEntry.user_id == User.id,
+        LeaveLedgerEntry.year == year,
+        LeaveLedgerEntry.id > func.coalesce(LeaveBalance.snapshot_ledger_id, 0),
+    )
+    users = select(
+        User.id.label("user_id"),
+        User.name.label("user_name"),
+        func.coalesce(LeaveBalance.total_leaves, DEFAULT_ALLOWANCE).label("total_leaves"),
+        (func.coalesce(LeaveBalance.used_leaves, 0)
+         + select(_used()).where(after_snapshot).scalar_subquery()).label("used_leaves"),
+    ).outerjoin(
+        LeaveBalance, and_(LeaveBalance.user_id == User.id, LeaveBalance.year == year)
+    ).where(*criteria).subquery()
+    return select(
+        users.c.user_id,
+        users.c.user_name,
+        users.c.total_leaves,
+        users.c.used_leaves,
+        (users.c.total_leaves - users.c.used_leaves).label("remaining_leaves"),
+        literal(year, Integer).label("year"),
+    ).order_by(users.c.user_id)
+
+
+def snapshot_balances(db: Session) -> None:
+    """Fold new ledger entries into LeaveBalance snapshots (scheduled job).
+
+    Every run folds all entries up to the current maximum id, so the highest
+    snapshot_ledger_id is a watermark below which nothing is left to fold.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Let in-flight inserts finish (and hold new ones) so that no entry
+        # below the watermark can commit after it has been read.
+        db.execute(text("LOCK TABLE leave_ledger IN SHARE MODE"))
+    watermark = db.scalar(select(func.max(LeaveLedgerEntry.id)))
+    folded = db.scalar(select(func.max(LeaveBalance.snapshot_ledger_id))) or 0
+    if watermark is None or watermark <= folded:
+        db.rollback()
+        return
+    tail = db.execute(
+        select(LeaveLedgerEntry.user_id, LeaveLedgerEntry.year, _used())
+        .where(LeaveLedgerEntry.id > folded, LeaveLedgerEntry.id <= watermark)
+        .group_by(LeaveLedgerEntry.user_id, LeaveLedgerEntry.year)
+    ).all()
+    rows = [
+        {"user_id": user_id, "year": year,
+         "total_leaves": DEFAULT_ALLOWANCE, "used_leaves": used,
+         "remaining_leaves": DEFAULT_ALLOWANCE - used, "snapshot_ledger_id": watermark}
+        for user_id, year, used in tail
+    ]
+    upsert = dialect_insert(db)
+    for i in range(0, len(rows), _UPSERT_BATCH):
+        stmt = upsert(LeaveBalance).values(rows[i:i + _UPSERT_BATCH])
+        used = LeaveBalance.used_leaves + stmt.excluded.used_leaves
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[LeaveBalance.user_id, LeaveBalance.year],
+            set_={
+                "used_leaves": used,
+                "remaining_leaves": LeaveBalance.total_leaves - used,
+                "snapshot_ledger_id": stmt.excluded.snapshot_ledger_id,
+                "version": LeaveBalance.version + 1,
+            },
+            # Compare-and-swap on the watermark: a row another run has
+            # already advanced past ``folded`` is left alone rather than
+            # having the same entries added twice.
+            where=LeaveBalance.snapshot_ledger_id <= folded,
+        ))
+    db.commit()
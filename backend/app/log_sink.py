@@ -0,0 +1,146 @@
+"""Buffered, non-blocking structured log sink.
+
+Callers only build a dict and push it onto a bounded in-memory queue; a
+background thread drains the queue in batches, serializes to JSON lines and
+appends them to the log file with one write per batch, rotating the file by
+size. When the queue is full new records are dropped and counted rather
+than blocking the request. Batches that cannot be written (full disk,
+permissions) are counted too, and the first such failure is reported through
+the standard ``logging`` module.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class AsyncLogSink:
+    def __init__(
+        self,
+        path: str,
+        level: str = "debug",
+        sample_rate: float = 1.0,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_bytes: int = 5_000_000,
+        backup_count: int = 3,
+    ):
+        self.path = Path(path)
+        self.level = LEVELS.get(level.lower(), LEVELS["debug"])
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0  # records refused because the queue was full
+        self.dropped_batches = 0  # batches lost to write or rotation errors
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def log(self, level: str, message: str, data: Optional[dict] = None, **fields) -> None:
+        if LEVELS.get(level, 0) < self.level:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if self._thread is None:
+            self.start()
+        record = {"level": level, "message": message, "data": data or {}, "timestamp": time.time() * 1000}
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, message: str, data: Optional[dict] = None, **fields) -> None:
+        self.log("debug", message, data, **fields)
+
+    def info(self, message: str, data: Optional[dict] = None, **fields) -> None:
+        self.log("info", message, data, **fields)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write out whatever is still queued."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout=5)
+
+    def _drain(self, first: dict) -> list[dict]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            self._write(self._drain(first))
+
+    def _write(self, batch: list[dict]) -> None:
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.max_bytes and self.path.exists() and self.path.stat().st_size + len(lines) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except Exception:
+            # Logging must never take the flusher (or the app) down; say so
+            # once instead of failing on every batch.
+            self.dropped_batches += 1
+            if self.dropped_batches == 1:
+                logger.exception("Log sink could not write to %s; dropping batches", self.path)
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+
+def _default_debug_log_path() -> str:
+    return str(Path(__file__).resolve().parents[3] / ".cursor" / "debug.log")
+
+
+debug_log = AsyncLogSink(
+    path=settings.debug_log_path or _default_debug_log_path(),
+    level=settings.debug_log_level,
+    sample_rate=settings.debug_log_sample_rate,
+    max_bytes=settings.debug_log_max_bytes,
+    backup_count=settings.debug_log_backup_count,
+    flush_interval=settings.debug_log_flush_interval_seconds,
+)
@@ -1,11 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.auth import password_hash_pool
+from app.config import settings
+from app.database import async_engine, engine
+from app.leave_ledger import snapshot_balances
+from app.org_stats import reconcile_org_stats
+from app.log_sink import debug_log
+from app.migrations import run_migrations
+from app.scheduler import scheduler
 from app.routers import auth, users, dashboard, leave, admin, recommendations, chatbot, career, learning, wellness, complaints
 
-Base.metadata.create_all(bind=engine)
+scheduler.add_job("auto_approve_leaves", settings.auto_approve_interval_seconds, leave.apply_auto_approvals)
+scheduler.add_job("snapshot_leave_balances", settings.leave_snapshot_interval_seconds, snapshot_balances)
+scheduler.add_job("reconcile_org_stats", settings.org_stats_reconcile_interval_seconds, reconcile_org_stats)
 
-app = FastAPI(title="Employee Self-Service Portal API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    run_migrations(engine)
+    debug_log.start()
+    if settings.scheduler_enabled:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    password_hash_pool.shutdown()
+    debug_log.stop()
+    # Pooled aiosqlite connections each hold a thread open until closed.
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Employee Self-Service Portal API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 app.include_router(auth.router)
@@ -0,0 +1,224 @@
+"""Versioned schema migrations.
+
+The applied version lives in the ``schema_version`` table, so startup costs a
+single version check once the database is current. Each migration is a
+function taking a Connection and runs in its own transaction together with
+the row that records it. Steps are written to be idempotent (add-if-missing,
+``checkfirst``) because the baseline creates tables from the current models:
+on a fresh database later migrations find their work already done.
+
+To change the schema, edit the model and append a new (version, description,
+function) entry to MIGRATIONS. Run pending migrations with::
+
+    python -m app.migrations
+"""
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import delete, func, inspect, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database import Base
+from app.models import (
+    Complaint,
+    DashboardConfig,
+    Holiday,
+    HolidayCalendar,
+    LeaveBalance,
+    LeaveLedgerEntry,
+    LeaveRequest,
+    OrgStats,
+    OrgStatsDelta,
+    PolicyAcknowledgement,
+    SchedulerLease,
+    SchemaVersion,
+    User,
+    UserDocument,
+    UserLearningAssignment,
+)
+from app.org_stats import write_org_stats
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant for pg_advisory_xact_lock so concurrent workers apply
+# migrations one at a time on PostgreSQL.
+_PG_LOCK_ID = 7262_0001
+
+
+def add_missing_columns(conn: Connection, table, column_names: list[str]) -> None:
+    """ALTER TABLE ... ADD COLUMN for model columns the database lacks."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+        if column.default is not None and column.default.is_scalar:
+            default = literal(column.default.arg, column.type).compile(
+                dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+            )
+            ddl += f" DEFAULT {default}"
+        conn.execute(text(ddl))
+
+
+def create_indexes(conn: Connection, table, index_names: list[str]) -> None:
+    """Create indexes declared on ``table`` (by name) that do not exist yet."""
+    by_name = {index.name: index for index in table.indexes}
+    for name in index_names:
+        by_name[name].create(conn, checkfirst=True)
+
+
+def _baseline(conn: Connection) -> None:
+    # Databases from before versioning may have any subset of tables and were
+    # patched column by column at seed time; bring them all to the same shape.
+    Base.metadata.create_all(conn)
+    add_missing_columns(conn, User.__table__, [
+        "phone", "address", "manager_id", "interests", "certifications",
+        "career_preferences", "token_version",
+    ])
+    add_missing_columns(conn, DashboardConfig.__table__, [
+        "show_profile", "show_attendance", "show_payroll", "show_career", "show_wellness",
+    ])
+    add_missing_columns(conn, LeaveRequest.__table__, ["created_at"])
+
+
+def _lookup_indexes(conn: Connection) -> None:
+    create_indexes(conn, User.__table__, ["ix_users_department_role"])
+    create_indexes(conn, Complaint.__table__, ["ix_complaints_employee_id"])
+    create_indexes(conn, UserDocument.__table__, ["ix_user_documents_user_id"])
+    create_indexes(conn, PolicyAcknowledgement.__table__, ["ix_policy_acknowledgements_user_id"])
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    create_indexes(conn, LeaveRequest.__table__, [
+        "ix_leave_requests_department_status",
+        "ix_leave_requests_employee_from_date",
+        "ix_leave_requests_status_created_at",
+    ])
+    create_indexes(conn, Complaint.__table__, ["ix_complaints_status_created_at"])
+    create_indexes(conn, UserLearningAssignment.__table__, ["ix_user_learning_assignments_user_id"])
+
+    # Balances were looked up with .first(), so duplicate (user_id, year) rows
+    # could exist; keep the oldest row of each pair, which is the one that was
+    # being read, before enforcing uniqueness.
+    balances = LeaveBalance.__table__
+    keep = select(func.min(balances.c.id)).group_by(balances.c.user_id, balances.c.year)
+    conn.execute(delete(balances).where(balances.c.id.not_in(keep.scalar_subquery())))
+    create_indexes(conn, balances, ["uq_leave_balances_user_year"])
+
+
+def _scheduler_leases(conn: Connection) -> None:
+    SchedulerLease.__table__.create(conn, checkfirst=True)
+
+
+def _history_index(conn: Connection) -> None:
+    create_indexes(conn, LeaveRequest.__table__, ["ix_leave_requests_department_from_date"])
+
+
+def _leave_ledger(conn: Connection) -> None:
+    LeaveLedgerEntry.__table__.create(conn, checkfirst=True)
+    add_missing_columns(conn, LeaveBalance.__table__, ["snapshot_ledger_id"])
+
+
+def _holiday_calendars(conn: Connection) -> None:
+    HolidayCalendar.__table__.create(conn, checkfirst=True)
+    Holiday.__table__.create(conn, checkfirst=True)
+
+
+def _row_versions(conn: Connection) -> None:
+    add_missing_columns(conn, LeaveRequest.__table__, ["version"])
+    add_missing_columns(conn, LeaveBalance.__table__, ["version"])
+
+
+def _leave_updated_at(conn: Connection) -> None:
+    add_missing_columns(conn, LeaveRequest.__table__, ["updated_at"])
+    leaves = LeaveRequest.__table__
+    conn.execute(
+        leaves.update()
+        .where(leaves.c.updated_at.is_(None))
+        .values(updated_at=func.coalesce(leaves.c.created_at, datetime.utcnow()))
+    )
+    create_indexes(conn, leaves, ["ix_leave_requests_department_updated_at"])
+
+
+def _org_stats(conn: Connection) -> None:
+    OrgStats.__table__.create(conn, checkfirst=True)
+    write_org_stats(conn, datetime.utcnow())
+
+
+def _normalize_leave_timestamps(conn: Connection) -> None:
+    # SQLite stores DateTime as text and compares it as text. Rows written
+    # outside SQLAlchemy may hold ISO 8601 with a "T" separator or a "Z"
+    # suffix, which sorts after the "YYYY-MM-DD HH:MM:SS" form the ORM binds,
+    # so auto-approval's created_at <= threshold would skip them for a day.
+    if conn.dialect.name != "sqlite":
+        return
+    for column in ("created_at", "updated_at"):
+        conn.execute(text(
+            f"UPDATE leave_requests SET {column} = rtrim(replace({column}, 'T', ' '), 'Z') "
+            f"WHERE {column} LIKE '%T%' OR {column} LIKE '%Z'"
+        ))
+
+
+def _org_stats_deltas(conn: Connection) -> None:
+    OrgStatsDelta.__table__.create(conn, checkfirst=True)
+    add_missing_columns(conn, OrgStats.__table__, ["folded_delta_id"])
+    write_org_stats(conn, datetime.utcnow())
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "indexes for department/role and per-user lookups", _lookup_indexes),
+    (3, "composite indexes for leave, balance and complaint queries", _hot_path_indexes),
+    (4, "scheduler_leases table for background jobs", _scheduler_leases),
+    (5, "index for paging department leave history", _history_index),
+    (6, "append-only leave ledger with balance snapshots", _leave_ledger),
+    (7, "holiday calendars for working-day leave counts", _holiday_calendars),
+    (8, "version columns for optimistic locking of leaves and balances", _row_versions),
+    (9, "updated_at on leave requests for calendar export validators", _leave_updated_at),
+    (10, "org_stats counters for the HR dashboard", _org_stats),
+    (11, "normalize ISO 8601 leave timestamps stored as text on SQLite", _normalize_leave_timestamps),
+    (12, "append-only org_stats_deltas instead of in-place counter updates", _org_stats_deltas),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations and return the resulting schema version."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+
+    with engine.begin() as conn:
+        SchemaVersion.__table__.create(conn, checkfirst=True)
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(select(func.pg_advisory_xact_lock(_PG_LOCK_ID)))
+            # Another worker may have applied it while we waited for the lock.
+            if current_version(conn) >= number:
+                continue
+            migrate(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+        logger.info("Applied migration %s: %s", number, description)
+    return LATEST_VERSION
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"Schema version: {run_migrations(engine)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Text, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Text, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -6,6 +6,9 @@ from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_department_role", "department", "role"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -20,6 +23,7 @@ class User(Base):
     interests = Column(Text, default="[]")  # JSON string
     certifications = Column(Text, default="[]")  # JSON list of {title, issuer, date, expiry?}
     career_preferences = Column(Text, default="{}")  # JSON e.g. {goals, preferred_roles, work_prefs}
+    token_version = Column(Integer, default=0)  # bumped on role/department change to revoke tokens
     
     leave_requests = relationship("LeaveRequest", back_populates="employee")
     dashboard_config = relationship("DashboardConfig", back_populates="user", uselist=False)
@@ -29,6 +33,13 @@ class User(Base):
 
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
+    __table_args__ = (
+        Index("ix_leave_requests_department_status", "department", "status"),  # /leave/pending
+        Index("ix_leave_requests_employee_from_date", "employee_id", "from_date"),  # /leave/my
+        Index("ix_leave_requests_department_from_date", "department", "from_date"),  # /leave/history
+        Index("ix_leave_requests_status_created_at", "status", "created_at"),  # auto-approval
+        Index("ix_leave_requests_department_updated_at", "department", "updated_at"),  # export ETag
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -38,8 +49,13 @@ class LeaveRequest(Base):
     reason = Column(String, nullable=False)
     status = Column(String, default="Pending")  # Pending, Approved, Rejected
     created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+    version = Column(Integer, nullable=False, default=1)
     
     employee = relationship("User", back_populates="leave_requests")
+    
+    # ORM updates/deletes compare-and-swap on version (StaleDataError on a lost race)
+    __mapper_args__ = {"version_id_col": version}
 
 
 class CompliancePolicy(Base):
@@ -88,7 +104,7 @@ class UserLearningAssignment(Base):
     __tablename__ = "user_learning_assignments"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     learning_content_id = Column(Integer, ForeignKey("learning_content.id"), nullable=False)
     assigned_at = Column(DateTime, default=datetime.utcnow)
     due_date = Column(Date, nullable=True)
@@ -117,6 +133,11 @@ class DashboardConfig(Base):
 
 class LeaveBalance(Base):
     __tablename__ = "leave_balances"
+    __table_args__ = (
+        # A unique index rather than a table constraint so it can be added to
+        # existing SQLite tables.
+        Index("uq_leave_balances_user_year", "user_id", "year", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -124,13 +145,59 @@ class LeaveBalance(Base):
     used_leaves = Column(Integer, default=0)
     remaining_leaves = Column(Integer, default=20)
     year = Column(Integer, nullable=False)
+    snapshot_ledger_id = Column(Integer, default=0)  # last leave_ledger id folded into this row
+    version = Column(Integer, nullable=False, default=1)
+    
+    __mapper_args__ = {"version_id_col": version}
+
+
+class LeaveLedgerEntry(Base):
+    """Append-only balance movement; LeaveBalance rows are snapshots of these."""
+    __tablename__ = "leave_ledger"
+    __table_args__ = (
+        Index("ix_leave_ledger_user_year", "user_id", "year", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # debit
+    days = Column(Integer, nullable=False)
+    leave_id = Column(Integer, ForeignKey("leave_requests.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class HolidayCalendar(Base):
+    """Working week and public holidays; department NULL is the default calendar."""
+    __tablename__ = "holiday_calendars"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    department = Column(String, unique=True, nullable=True)
+    weekmask = Column(String, default="1111100")  # Mon..Sun, 1 = working day
+    
+    holidays = relationship("Holiday", back_populates="calendar", cascade="all, delete-orphan")
+
+
+class Holiday(Base):
+    __tablename__ = "holidays"
+    __table_args__ = (
+        Index("uq_holidays_calendar_date", "calendar_id", "date", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    calendar_id = Column(Integer, ForeignKey("holiday_calendars.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    name = Column(String, nullable=False)
+    
+    calendar = relationship("HolidayCalendar", back_populates="holidays")
 
 
 class UserDocument(Base):
     __tablename__ = "user_documents"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     type = Column(String, nullable=False)  # "id", "certificate"
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
@@ -143,7 +210,7 @@ class PolicyAcknowledgement(Base):
     __tablename__ = "policy_acknowledgements"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     policy_slug = Column(String, nullable=False)  # hr, ai, it, finance
     acknowledged_at = Column(DateTime, default=datetime.utcnow)
     
@@ -173,9 +240,12 @@ class Payroll(Base):
 
 class Complaint(Base):
     __tablename__ = "complaints"
+    __table_args__ = (
+        Index("ix_complaints_status_created_at", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    employee_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     subject = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     status = Column(String, default="Open")  # Open, In Progress, Resolved, Closed
@@ -195,3 +265,50 @@ class UserAISuggestionProgress(Base):
     completed_at = Column(DateTime, nullable=True)
     
     user = relationship("User", backref="ai_suggestion_progress")
+
+
+class SchemaVersion(Base):
+    """One row per applied migration; see app/migrations.py."""
+    __tablename__ = "schema_version"
+    
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SchedulerLease(Base):
+    """Which worker currently runs a background job; see app/scheduler.py."""
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class OrgStats(Base):
+    """Organisation-wide counters for the HR dashboard; a single row, see app/org_stats.py."""
+    __tablename__ = "org_stats"
+    
+    id = Column(Integer, primary_key=True)
+    total_employees = Column(Integer, nullable=False, default=0)
+    pending_leaves = Column(Integer, nullable=False, default=0)
+    open_complaints = Column(Integer, nullable=False, default=0)
+    total_learning = Column(Integer, nullable=False, default=0)
+    completed_learning = Column(Integer, nullable=False, default=0)
+    compliance_due = Column(Integer, nullable=False, default=0)  # due_date >= as_of
+    compliance_overdue = Column(Integer, nullable=False, default=0)  # due_date < as_of
+    as_of = Column(Date, nullable=False)
+    reconciled_at = Column(DateTime, nullable=True)
+    folded_delta_id = Column(Integer, nullable=False, default=0)  # last org_stats_deltas id counted
+
+
+class OrgStatsDelta(Base):
+    """Append-only change to an org_stats counter, folded in by reconcile_org_stats."""
+    __tablename__ = "org_stats_deltas"
+    # Folded rows are deleted; ids must not be reused below the watermark.
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    counter = Column(String, nullable=False)  # an OrgStats column, or "compliance"
+    delta = Column(Integer, nullable=False)
+    due_date = Column(Date, nullable=True)  # compliance changes: split into due/overdue when read
@@ -0,0 +1,208 @@
+"""Materialized organisation counters for the HR dashboard.
+
+The single org_stats row holds the counts the HR dashboard shows, so a load
+reads one row instead of counting users, leaves, complaints, learning and
+compliance tables. Mapper listeners record the effect of every ORM write as
+rows in the append-only org_stats_deltas table, in the same transaction, so a
+change commits or rolls back together with the write that caused it while
+concurrent writers never contend for the org_stats row. ``read_org_stats``
+adds the deltas recorded since the row was last counted, and
+``reconcile_org_stats``, a scheduled job, recounts everything, moves the
+row's ``folded_delta_id`` watermark forward and deletes the folded deltas.
+Writes that bypass mapper events either record deltas themselves
+(``adjust_org_stats``) or are corrected by the next reconcile.
+
+Compliance policies are split into due and overdue relative to ``as_of``.
+Their deltas carry the policy's due date and are split when read. Once the
+day has changed, ``read_org_stats`` splits all policies live until the next
+reconcile moves ``as_of`` forward.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Complaint,
+    CompliancePolicy,
+    LearningContent,
+    LeaveRequest,
+    OrgStats,
+    OrgStatsDelta,
+    User,
+    UserLearningProgress,
+)
+
+ORG_STATS_ID = 1
+OPEN_COMPLAINT_STATUSES = ("Open", "In Progress")
+COMPLIANCE = "compliance"
+
+# (counter, model, attribute, counted values); a row counts when its attribute
+# is one of the values, or always when they are None.
+_COUNTERS: list[tuple[str, type, str, Optional[tuple]]] = [
+    ("total_employees", User, "role", ("employee",)),
+    ("pending_leaves", LeaveRequest, "status", ("Pending",)),
+    ("open_complaints", Complaint, "status", OPEN_COMPLAINT_STATUSES),
+    ("total_learning", LearningContent, "id", None),
+    ("completed_learning", UserLearningProgress, "status", ("completed",)),
+]
+
+_COUNTER_NAMES = [counter for counter, _, _, _ in _COUNTERS] + ["compliance_due", "compliance_overdue"]
+
+
+def adjust_org_stats(db, **deltas: int) -> None:
+    """Record ``deltas`` to the named counters; ``db`` is a Session or Connection. Does not commit."""
+    rows = [{"counter": name, "delta": delta} for name, delta in deltas.items() if delta]
+    if rows:
+        db.execute(insert(OrgStatsDelta), rows)
+
+
+def _compliance_split(db, today: date) -> dict:
+    due, overdue = db.execute(select(
+        func.coalesce(func.sum(case((CompliancePolicy.due_date >= today, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((CompliancePolicy.due_date < today, 1), else_=0)), 0),
+    )).one()
+    return {"compliance_due": due, "compliance_overdue": overdue}
+
+
+def count_org_stats(db, today: date) -> dict:
+    """Every counter recounted from its table."""
+    counts = {}
+    for counter, model, attr, values in _COUNTERS:
+        query = select(func.count()).select_from(model)
+        if values is not None:
+            query = query.where(getattr(model, attr).in_(values))
+        counts[counter] = db.scalar(query)
+    counts.update(_compliance_split(db, today))
+    return counts
+
+
+def write_org_stats(db, now: datetime) -> None:
+    """Replace the counters with a full recount and drop the deltas it covers. Does not commit.
+
+    ``now`` stamps reconciled_at; ``as_of`` is the local ``date.today()``,
+    the same clock ``read_org_stats`` compares it with.
+    """
+    today = date.today()
+    # Touch the row before counting: that takes its lock (SQLite's write
+    # lock), so a concurrent write either committed before our counts or
+    # records its delta after the watermark, never in between.
+    locked = db.execute(
+        update(OrgStats).where(OrgStats.id == ORG_STATS_ID).values(reconciled_at=now)
+    ).rowcount
+    values = {"as_of": today}
+    # ``db`` is a Connection during migrations. Migration 10 recounts before
+    # migration 12 has created org_stats_deltas, so there is nothing to fold.
+    has_deltas = not isinstance(db, Connection) or inspect(db).has_table(OrgStatsDelta.__tablename__)
+    if has_deltas:
+        dialect = db.dialect if isinstance(db, Connection) else db.get_bind().dialect
+        if dialect.name == "postgresql":
+            # Hold new deltas until we commit, so none below the watermark
+            # can commit after the recount has been taken.
+            db.execute(text("LOCK TABLE org_stats_deltas IN SHARE MODE"))
+        values["folded_delta_id"] = db.scalar(select(func.max(OrgStatsDelta.id))) or 0
+    values.update(count_org_stats(db, today))
+    if locked:
+        db.execute(update(OrgStats).where(OrgStats.id == ORG_STATS_ID).values(values))
+    else:
+        db.execute(insert(OrgStats).values(id=ORG_STATS_ID, reconciled_at=now, **values))
+    if has_deltas:
+        db.execute(delete(OrgStatsDelta).where(OrgStatsDelta.id <= values["folded_delta_id"]))
+
+
+def reconcile_org_stats(db: Session) -> None:
+    """Recount org_stats (scheduled job)."""
+    write_org_stats(db, datetime.utcnow())
+    db.commit()
+
+
+def read_org_stats(db: Session) -> dict:
+    """Current counters: the row plus newer deltas, recounting live only what they cannot answer."""
+    today = date.today()
+    stats = db.get(OrgStats, ORG_STATS_ID)
+    if stats is None:
+        return count_org_stats(db, today)
+    counts = {name: getattr(stats, name) for name in _COUNTER_NAMES}
+    counter = case(
+        (OrgStatsDelta.counter != COMPLIANCE, OrgStatsDelta.counter),
+        (OrgStatsDelta.due_date < stats.as_of, "compliance_overdue"),
+        else_="compliance_due",
+    )
+    tail = db.execute(
+        select(counter, func.sum(OrgStatsDelta.delta))
+        .where(OrgStatsDelta.id > stats.folded_delta_id)
+        .group_by(counter)
+    ).all()
+    for name, delta in tail:
+        counts[name] += delta
+    if stats.as_of != today:
+        counts.update(_compliance_split(db, today))
+    return counts
+
+
+def _previous(target, attr: str):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+def _keep_previous(attribute) -> None:
+    """Make ``_previous`` reliable for ``attribute``.
+
+    Setting an expired attribute (e.g. after a commit) does not load the old
+    value unless some listener asks for active history.
+    """
+    event.listen(attribute, "set", lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+def _track(counter: str, model, attr: str, values: Optional[tuple]) -> None:
+    def counted(value) -> int:
+        return int(values is None or value in values)
+
+    if values is not None:
+        _keep_previous(getattr(model, attr))
+
+    @event.listens_for(model, "after_insert")
+    def _inserted(mapper, connection, target):
+        adjust_org_stats(connection, **{counter: counted(getattr(target, attr))})
+
+    @event.listens_for(model, "after_update")
+    def _updated(mapper, connection, target):
+        adjust_org_stats(connection, **{counter: counted(getattr(target, attr)) - counted(_previous(target, attr))})
+
+    @event.listens_for(model, "after_delete")
+    def _deleted(mapper, connection, target):
+        adjust_org_stats(connection, **{counter: -counted(getattr(target, attr))})
+
+
+for _counter in _COUNTERS:
+    _track(*_counter)
+
+
+def _adjust_compliance(connection, changes: list[tuple[date, int]]) -> None:
+    """Record ``(due_date, +1/-1)`` changes; reads split them into due and overdue."""
+    connection.execute(insert(OrgStatsDelta), [
+        {"counter": COMPLIANCE, "delta": sign, "due_date": due_date} for due_date, sign in changes
+    ])
+
+
+_keep_previous(CompliancePolicy.due_date)
+
+
+@event.listens_for(CompliancePolicy, "after_insert")
+def _policy_inserted(mapper, connection, target):
+    _adjust_compliance(connection, [(target.due_date, 1)])
+
+
+@event.listens_for(CompliancePolicy, "after_update")
+def _policy_updated(mapper, connection, target):
+    previous = _previous(target, "due_date")
+    if previous != target.due_date:
+        _adjust_compliance(connection, [(previous, -1), (target.due_date, 1)])
+
+
+@event.listens_for(CompliancePolicy, "after_delete")
+def _policy_deleted(mapper, connection, target):
+    _adjust_compliance(connection, [(target.due_date, -1)])
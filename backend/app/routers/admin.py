@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.models import User, CompliancePolicy, ComplianceCategoryRule, LearningContent, DashboardConfig, Complaint, Payroll
+from app.models import User, CompliancePolicy, ComplianceCategoryRule, LearningContent, DashboardConfig, Complaint, Payroll, HolidayCalendar, Holiday
 from app.schemas import (
     UserCreate, UserResponse,
     CompliancePolicyCreate, CompliancePolicyResponse,
@@ -11,12 +11,14 @@ from app.schemas import (
     ComplaintWithEmployeeResponse,
     ComplaintStatusUpdate,
     LearningContentCreate, LearningContentResponse,
-    PayrollCreate, PayrollUpdate, PayrollResponse
+    PayrollCreate, PayrollUpdate, PayrollResponse,
+    HolidayCalendarCreate, HolidayCalendarResponse, HolidayCreate, HolidayResponse
 )
-from app.dependencies import require_role
-from app.auth import get_password_hash
+from app.dependencies import Principal, require_role
+from app.auth import get_password_hash, password_hash_pool
 from datetime import datetime
 import json
+import numpy as np
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -24,7 +26,7 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 @router.post("/user", response_model=UserResponse)
 def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -65,7 +67,7 @@ def create_user(
 @router.delete("/user/{user_id}")
 def delete_user(
     user_id: int,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     if user_id == current_user.id:
@@ -86,9 +88,16 @@ def delete_user(
     return {"message": "User deleted successfully"}
 
 
+@router.get("/metrics/password-hashing")
+def get_password_hashing_metrics(
+    current_user: Principal = Depends(require_role("hr")),
+):
+    return password_hash_pool.metrics()
+
+
 @router.get("/compliance", response_model=List[CompliancePolicyResponse])
 def list_compliance_policies(
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     policies = db.query(CompliancePolicy).order_by(CompliancePolicy.due_date).all()
@@ -98,7 +107,7 @@ def list_compliance_policies(
 @router.post("/compliance", response_model=CompliancePolicyResponse)
 def create_compliance_policy(
     policy_data: CompliancePolicyCreate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     new_policy = CompliancePolicy(
@@ -116,7 +125,7 @@ def create_compliance_policy(
 @router.delete("/compliance/{policy_id}")
 def delete_compliance_policy(
     policy_id: int,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     policy = db.query(CompliancePolicy).filter(CompliancePolicy.id == policy_id).first()
@@ -133,7 +142,7 @@ def delete_compliance_policy(
 # Category rules (Policy rules by category) - HR can add rules under hr, ai, it, finance
 @router.get("/compliance-category-rules", response_model=ComplianceCategoryRulesByCategory)
 def list_compliance_category_rules(
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     rows = db.query(ComplianceCategoryRule).order_by(
@@ -151,7 +160,7 @@ def list_compliance_category_rules(
 @router.post("/compliance-category-rules", response_model=ComplianceCategoryRuleResponse)
 def create_compliance_category_rule(
     body: ComplianceCategoryRuleCreate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     if body.category not in ("hr", "ai", "it", "finance"):
@@ -173,7 +182,7 @@ def create_compliance_category_rule(
 @router.delete("/compliance-category-rules/{rule_id}")
 def delete_compliance_category_rule(
     rule_id: int,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     rule = db.query(ComplianceCategoryRule).filter(ComplianceCategoryRule.id == rule_id).first()
@@ -187,10 +196,103 @@ def delete_compliance_category_rule(
     return {"message": "Category rule deleted successfully"}
 
 
+# Holiday calendars used to count leave in working days (see app/working_days.py)
+@router.get("/holiday-calendars", response_model=List[HolidayCalendarResponse])
+def list_holiday_calendars(
+    current_user: Principal = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    return db.query(HolidayCalendar).order_by(HolidayCalendar.department, HolidayCalendar.id).all()
+
+
+@router.post("/holiday-calendars", response_model=HolidayCalendarResponse)
+def create_holiday_calendar(
+    body: HolidayCalendarCreate,
+    current_user: Principal = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    try:
+        np.busdaycalendar(weekmask=body.weekmask)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="weekmask must be 7 characters of 0/1 for Monday..Sunday"
+        )
+    if db.query(HolidayCalendar).filter(HolidayCalendar.department.is_not_distinct_from(body.department)).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A calendar already exists for this department"
+        )
+    calendar = HolidayCalendar(name=body.name, department=body.department, weekmask=body.weekmask)
+    db.add(calendar)
+    db.commit()
+    db.refresh(calendar)
+    return calendar
+
+
+@router.delete("/holiday-calendars/{calendar_id}")
+def delete_holiday_calendar(
+    calendar_id: int,
+    current_user: Principal = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    calendar = db.query(HolidayCalendar).filter(HolidayCalendar.id == calendar_id).first()
+    if not calendar:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Holiday calendar not found"
+        )
+    db.delete(calendar)
+    db.commit()
+    return {"message": "Holiday calendar deleted successfully"}
+
+
+@router.post("/holiday-calendars/{calendar_id}/holidays", response_model=HolidayResponse)
+def add_holiday(
+    calendar_id: int,
+    body: HolidayCreate,
+    current_user: Principal = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    if not db.query(HolidayCalendar).filter(HolidayCalendar.id == calendar_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Holiday calendar not found"
+        )
+    if db.query(Holiday).filter(Holiday.calendar_id == calendar_id, Holiday.date == body.date).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This date is already a holiday in the calendar"
+        )
+    holiday = Holiday(calendar_id=calendar_id, date=body.date, name=body.name.strip())
+    db.add(holiday)
+    db.commit()
+    db.refresh(holiday)
+    return holiday
+
+
+@router.delete("/holiday-calendars/{calendar_id}/holidays/{holiday_id}")
+def delete_holiday(
+    calendar_id: int,
+    holiday_id: int,
+    current_user: Principal = Depends(require_role("hr")),
+    db: Session = Depends(get_db)
+):
+    holiday = db.query(Holiday).filter(Holiday.id == holiday_id, Holiday.calendar_id == calendar_id).first()
+    if not holiday:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Holiday not found"
+        )
+    db.delete(holiday)
+    db.commit()
+    return {"message": "Holiday deleted successfully"}
+
+
 # HR: list all complaints and update status
 @router.get("/complaints", response_model=List[ComplaintWithEmployeeResponse])
 def list_complaints_hr(
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     rows = db.query(Complaint).order_by(Complaint.created_at.desc()).all()
@@ -215,7 +317,7 @@ def list_complaints_hr(
 def update_complaint_status(
     complaint_id: int,
     body: ComplaintStatusUpdate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
@@ -238,7 +340,7 @@ def update_complaint_status(
 @router.post("/learning", response_model=LearningContentResponse)
 def create_learning_content(
     content_data: LearningContentCreate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     tags_json = json.dumps(content_data.tags)
@@ -258,7 +360,7 @@ def create_learning_content(
 @router.get("/payroll/{user_id}", response_model=PayrollResponse)
 def get_payroll(
     user_id: int,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     payroll = db.query(Payroll).filter(Payroll.user_id == user_id).first()
@@ -273,7 +375,7 @@ def get_payroll(
 @router.post("/payroll", response_model=PayrollResponse)
 def create_payroll(
     payroll_data: PayrollCreate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     # Check if user exists
@@ -317,7 +419,7 @@ def create_payroll(
 def update_payroll(
     user_id: int,
     payroll_data: PayrollUpdate,
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db)
 ):
     payroll = db.query(Payroll).filter(Payroll.user_id == user_id).first()
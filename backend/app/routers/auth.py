@@ -1,46 +1,43 @@
-import os
-import json
-from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.database import get_db
 from app.models import User, DashboardConfig
 from app.schemas import LoginRequest, Token, UserCreate, UserResponse
-from app.auth import verify_password, get_password_hash, create_access_token
+from app.auth import get_password_hash, create_access_token, password_hash_pool, PasswordHashBusy
 from app.config import settings
+from app.log_sink import debug_log
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-def _debug_log(msg: str, data: dict, hypothesis_id: str = ""):
-    # #region agent log
-    try:
-        log_path = os.environ.get("DEBUG_LOG_PATH") or str(Path(__file__).resolve().parent.parent.parent.parent.parent / ".cursor" / "debug.log")
-        payload = {"message": msg, "data": data, "timestamp": __import__("time").time() * 1000, "sessionId": "debug-session", "hypothesisId": hypothesis_id, "location": "auth.py:login"}
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(payload) + "\n")
-    except Exception:
-        pass
-    # #endregion
-
 
 @router.post("/login", response_model=Token)
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
     # #region agent log
-    _debug_log("login request", {"email": credentials.email, "password_len": len(credentials.password)}, "C")
+    debug_log.debug("login request", {"email": credentials.email, "password_len": len(credentials.password)}, hypothesisId="C", location="auth.py:login")
     # #endregion
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == credentials.email).first()
+    )
     # #region agent log
-    _debug_log("user lookup", {"email": credentials.email, "user_found": user is not None, "user_id": getattr(user, "id", None)}, "A")
+    debug_log.debug("user lookup", {"email": credentials.email, "user_found": user is not None, "user_id": getattr(user, "id", None)}, hypothesisId="A", location="auth.py:login")
     # #endregion
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    try:
+        pwd_ok = await password_hash_pool.verify(credentials.password, user.password_hash)
+    except PasswordHashBusy:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-ins in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
     # #region agent log
-    pwd_ok = verify_password(credentials.password, user.password_hash)
-    _debug_log("password check", {"user_id": user.id, "password_ok": pwd_ok, "hash_prefix": (user.password_hash or "")[:20]}, "B")
+    debug_log.debug("password check", {"user_id": user.id, "password_ok": pwd_ok}, hypothesisId="B", location="auth.py:login")
     # #endregion
     if not pwd_ok:
         raise HTTPException(
@@ -50,7 +47,7 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": str(user.id), "role": user.role, "department": user.department},
+        data={"sub": str(user.id), "role": user.role, "department": user.department, "ver": user.token_version or 0},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
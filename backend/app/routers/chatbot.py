@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.database import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from app.database import get_async_db
 from app.models import (
     User,
     CompliancePolicy,
     ComplianceCategoryRule,
     LearningContent,
-    LeaveBalance,
     LeaveRequest,
 )
 from app.schemas import ChatbotRequest, ChatbotResponse
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_async
+from app.leave_ledger import DEFAULT_ALLOWANCE, balances_query
 from datetime import date
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
@@ -102,19 +103,19 @@ TFIDF_THRESHOLD = 0.25
 KEYWORD_BOOST = 0.2
 
 
-def _get_user_policies(db: Session, current_user: User):
+async def _get_user_policies(db: AsyncSession, current_user: User):
     """Policies for user's department or department='All'."""
-    return db.query(CompliancePolicy).filter(
+    return (await db.execute(select(CompliancePolicy).filter(
         or_(
             CompliancePolicy.department == current_user.department,
             CompliancePolicy.department.ilike("all"),
         )
-    ).order_by(CompliancePolicy.due_date).all()
+    ).order_by(CompliancePolicy.due_date))).scalars().all()
 
 
-def _get_learning_content(db: Session, current_user: User):
+async def _get_learning_content(db: AsyncSession, current_user: User):
     """Get learning content relevant to user."""
-    all_learning = db.query(LearningContent).all()
+    all_learning = (await db.execute(select(LearningContent))).scalars().all()
     relevant = []
     dept_lower = current_user.department.lower()
     for content in all_learning:
@@ -126,23 +127,19 @@ def _get_learning_content(db: Session, current_user: User):
     return relevant[:5] if relevant else all_learning[:5]
 
 
-def _get_leave_balance(db: Session, current_user: User) -> int:
+async def _get_leave_balance(db: AsyncSession, current_user: User) -> int:
     """User's remaining leave balance for current year."""
-    current_year = date.today().year
-    balance = db.query(LeaveBalance).filter(
-        LeaveBalance.user_id == current_user.id,
-        LeaveBalance.year == current_year,
-    ).first()
-    if balance:
-        return balance.remaining_leaves
-    return 20
+    balance = (await db.execute(
+        balances_query(date.today().year, User.id == current_user.id)
+    )).mappings().first()
+    return balance["remaining_leaves"] if balance else DEFAULT_ALLOWANCE
 
 
-def _get_user_leave_requests(db: Session, current_user: User):
+async def _get_user_leave_requests(db: AsyncSession, current_user: User):
     """User's leave requests for summary."""
-    return db.query(LeaveRequest).filter(
+    return (await db.execute(select(LeaveRequest).filter(
         LeaveRequest.employee_id == current_user.id
-    ).order_by(LeaveRequest.from_date.desc()).limit(10).all()
+    ).order_by(LeaveRequest.from_date.desc()).limit(10))).scalars().all()
 
 
 def _format_policies_response(policies) -> str:
@@ -166,12 +163,12 @@ def _format_learning_response(learning_content) -> str:
     return "\n".join(parts)
 
 
-def _build_corpus(db: Session, current_user: User) -> list[DocEntry]:
+async def _build_corpus(db: AsyncSession, current_user: User) -> list[DocEntry]:
     """Build list of (text, response, source_type) from dashboard data and static content."""
     entries: list[DocEntry] = []
 
     # Policies
-    policies = _get_user_policies(db, current_user)
+    policies = await _get_user_policies(db, current_user)
     if policies:
         response = _format_policies_response(policies)
         for p in policies[:10]:
@@ -183,7 +180,7 @@ def _build_corpus(db: Session, current_user: User) -> list[DocEntry]:
         )
 
     # Learning
-    learning = _get_learning_content(db, current_user)
+    learning = await _get_learning_content(db, current_user)
     if learning:
         response = _format_learning_response(learning)
         for c in learning[:5]:
@@ -196,14 +193,14 @@ def _build_corpus(db: Session, current_user: User) -> list[DocEntry]:
         )
 
     # Leave balance
-    remaining = _get_leave_balance(db, current_user)
+    remaining = await _get_leave_balance(db, current_user)
     leave_balance_response = f"You have {remaining} days of leave remaining this year."
     entries.append(
         ("leave balance remaining days leaves left", leave_balance_response, "leave")
     )
 
     # Leave requests summary
-    requests = _get_user_leave_requests(db, current_user)
+    requests = await _get_user_leave_requests(db, current_user)
     if requests:
         parts = ["Your recent leave requests:"]
         for r in requests[:5]:
@@ -246,9 +243,9 @@ def _build_corpus(db: Session, current_user: User) -> list[DocEntry]:
     entries.append((career_text, career_response, "career"))
 
     # Compliance category rules
-    rules = db.query(ComplianceCategoryRule).order_by(
+    rules = (await db.execute(select(ComplianceCategoryRule).order_by(
         ComplianceCategoryRule.category, ComplianceCategoryRule.display_order, ComplianceCategoryRule.id
-    ).all()
+    ))).scalars().all()
     for r in rules:
         entries.append((r.rule_text or "", r.rule_text or "", "compliance"))
 
@@ -301,10 +298,10 @@ def _tfidf_best_match(message: str, corpus: list[DocEntry]) -> tuple[str | None,
 
 
 @router.post("/echo", response_model=ChatbotResponse)
-def echo_chatbot(
+async def echo_chatbot(
     request: ChatbotRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """TF-IDF + keyword-based chatbot using dashboard text; no external API."""
     message = (request.message or "").strip()
@@ -312,7 +309,7 @@ def echo_chatbot(
 
     # Exact fallbacks first (numeric/specific answers)
     if "leave balance" in message_lower or "leaves left" in message_lower:
-        remaining = _get_leave_balance(db, current_user)
+        remaining = await _get_leave_balance(db, current_user)
         return ChatbotResponse(
             response=f"You have {remaining} days of leave remaining this year.",
             go_to_path="/leave",
@@ -327,8 +324,9 @@ def echo_chatbot(
         )
 
     # Build corpus and run TF-IDF
-    corpus = _build_corpus(db, current_user)
-    response_text, score, source_type = _tfidf_best_match(message, corpus)
+    corpus = await _build_corpus(db, current_user)
+    # TF-IDF fitting is CPU-bound; keep it off the event loop.
+    response_text, score, source_type = await run_in_threadpool(_tfidf_best_match, message, corpus)
 
     if response_text is not None and score >= TFIDF_THRESHOLD:
         path_label = SOURCE_TYPE_TO_PATH_LABEL.get(source_type) if source_type and source_type != "faq" else None
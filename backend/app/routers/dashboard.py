@@ -1,42 +1,67 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, LeaveRequest, DashboardConfig, CompliancePolicy, LearningContent, LeaveBalance, Complaint
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from app.database import get_async_db
+from app.models import User, LeaveRequest, DashboardConfig, LeaveBalance, Complaint
 from app.schemas import DashboardData, DashboardConfigUpdate, DashboardConfigResponse, LeaveRequestResponse, UserResponse, ComplaintResponse
-from app.dependencies import get_current_user
-from app.routers.leave import apply_auto_approvals
-from datetime import date, datetime
+from app.dependencies import Principal, get_current_principal_async
+from app.dashboard_cache import dashboard_cache
+from app.dashboard_composer import DashboardComposer, server_timing
+from app.leave_export import not_modified
+from app.org_stats import OPEN_COMPLAINT_STATUSES, read_org_stats
+from datetime import date
 import json
+import time
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Longest pending-leave and open-complaint lists on the HR dashboard; the
+# totals come from org_stats.
+HR_DASHBOARD_TOP_N = 20
+
+composer = DashboardComposer()
+
 
 @router.get("", response_model=DashboardData)
-def get_dashboard(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_dashboard(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    config = db.query(DashboardConfig).filter(DashboardConfig.user_id == current_user.id).first()
-    if not config:
-        config = DashboardConfig(
-            user_id=current_user.id,
-            show_leaves=True,
-            show_learning=True,
-            show_compliance=True,
-            show_profile=True,
-            show_attendance=True,
-            show_payroll=True,
-            show_career=True,
-            show_wellness=True,
+    """The caller's dashboard, served from dashboard_cache when it is current.
+
+    On a miss the enabled widgets are built concurrently by ``composer`` and
+    their timings are reported in Server-Timing. Answers 304 without touching
+    the database when If-None-Match carries the cached ETag.
+    """
+    cached = dashboard_cache.get(current_user)
+    timing = "cache;desc=hit"
+    if cached is None:
+        start = time.perf_counter()
+        generation = dashboard_cache.generation
+        config = await _dashboard_config(db, current_user.id)
+        config_ms = (time.perf_counter() - start) * 1000
+        dashboard_data, timings = await composer.compose(current_user, config)
+        cached = dashboard_cache.put(current_user, dashboard_data.model_dump_json().encode(), generation)
+        timing = server_timing(
+            {"config": config_ms, **timings, "total": (time.perf_counter() - start) * 1000}
         )
-        db.add(config)
-        db.commit()
-        db.refresh(config)
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache", "Server-Timing": timing}
+    if not_modified(request.headers, cached.etag, None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+async def _dashboard_config(db: AsyncSession, user_id: int) -> DashboardConfigResponse:
+    # A user without a saved config sees the defaults; the row is only
+    # created when they change something (POST /dashboard/config).
+    config = await db.get(DashboardConfig, user_id)
     
     def get_show(config, key, default=True):
         return getattr(config, key, default) if config else default
     
-    dashboard_data = DashboardData(config=DashboardConfigResponse(
+    return DashboardConfigResponse(
         show_leaves=get_show(config, "show_leaves"),
         show_learning=get_show(config, "show_learning"),
         show_compliance=get_show(config, "show_compliance"),
@@ -45,164 +70,147 @@ def get_dashboard(
         show_payroll=get_show(config, "show_payroll"),
         show_career=get_show(config, "show_career"),
         show_wellness=get_show(config, "show_wellness"),
-    ))
-    
-    if current_user.role == "employee":
-        apply_auto_approvals(db)
-        leaves = db.query(LeaveRequest).filter(
-            LeaveRequest.employee_id == current_user.id
-        ).all()
-        dashboard_data.leave_requests = [
-            LeaveRequestResponse(
-                id=l.id,
-                employee_id=l.employee_id,
-                department=l.department,
-                from_date=l.from_date,
-                to_date=l.to_date,
-                reason=l.reason,
-                status=l.status,
-                created_at=getattr(l, "created_at", None),
-            ) for l in leaves
-        ]
-    
-    elif current_user.role == "hr":
-        from app.models import UserLearningProgress
-        total_employees = db.query(User).filter(User.role == "employee").count()
-        apply_auto_approvals(db)
-        pending_leaves_all = (
-            db.query(LeaveRequest).filter(LeaveRequest.status == "Pending").join(User).all()
+    )
+
+
+def _leave_response(l, with_name: bool = True) -> LeaveRequestResponse:
+    return LeaveRequestResponse(
+        id=l.id,
+        employee_id=l.employee_id,
+        department=l.department,
+        from_date=l.from_date,
+        to_date=l.to_date,
+        reason=l.reason,
+        status=l.status,
+        employee_name=l.employee.name if with_name and l.employee else None,
+        created_at=getattr(l, "created_at", None),
+    )
+
+
+@composer.widget("my_leaves", roles=["employee"], flag="show_leaves")
+async def _my_leaves(current_user: Principal, db: AsyncSession) -> dict:
+    leaves = (await db.execute(
+        select(LeaveRequest).filter(LeaveRequest.employee_id == current_user.id)
+    )).scalars().all()
+    return {"leave_requests": [_leave_response(l, with_name=False) for l in leaves]}
+
+
+@composer.widget("org_summary", roles=["hr"])
+async def _org_summary(current_user: Principal, db: AsyncSession) -> dict:
+    stats = await db.run_sync(read_org_stats)
+    total_learning = stats["total_learning"]
+    learning_pct = min(100, round(100 * stats["completed_learning"] / total_learning, 0)) if total_learning else 0
+    ai_insights = []
+    if stats["pending_leaves"] > 5:
+        ai_insights.append(f"{stats['pending_leaves']} leave requests pending approval across the organization.")
+    if stats["compliance_overdue"] > 0:
+        ai_insights.append(f"{stats['compliance_overdue']} compliance policy/policies overdue.")
+    if stats["open_complaints"]:
+        ai_insights.append(f"{stats['open_complaints']} employee complaint(s) open. Review in Complaints tab.")
+    return {"recommendations": {
+        "total_employees": stats["total_employees"],
+        "pending_leaves_count": stats["pending_leaves"],
+        "compliance_due": stats["compliance_due"],
+        "compliance_overdue": stats["compliance_overdue"],
+        "learning_completion_pct": learning_pct,
+        "pending_complaints_count": stats["open_complaints"],
+        "ai_insights": ai_insights[:5],
+    }}
+
+
+@composer.widget("org_pending_leaves", roles=["hr"], flag="show_leaves")
+async def _org_pending_leaves(current_user: Principal, db: AsyncSession) -> dict:
+    pending_leaves = (await db.execute(
+        select(LeaveRequest).join(User).options(contains_eager(LeaveRequest.employee))
+        .filter(LeaveRequest.status == "Pending")
+        .order_by(LeaveRequest.created_at.desc())
+        .limit(HR_DASHBOARD_TOP_N)
+    )).scalars().all()
+    return {"pending_leaves": [_leave_response(l) for l in pending_leaves]}
+
+
+@composer.widget("open_complaints", roles=["hr"])
+async def _open_complaints(current_user: Principal, db: AsyncSession) -> dict:
+    open_complaints = (await db.execute(
+        select(Complaint).filter(Complaint.status.in_(OPEN_COMPLAINT_STATUSES))
+        .order_by(Complaint.created_at.desc())
+        .limit(HR_DASHBOARD_TOP_N)
+    )).scalars().all()
+    return {"pending_complaints": [
+        ComplaintResponse(
+            id=c.id,
+            employee_id=c.employee_id,
+            subject=c.subject,
+            description=c.description,
+            status=c.status,
+            created_at=getattr(c, "created_at", None),
         )
-        dashboard_data.pending_leaves = [
-            LeaveRequestResponse(
-                id=l.id,
-                employee_id=l.employee_id,
-                department=l.department,
-                from_date=l.from_date,
-                to_date=l.to_date,
-                reason=l.reason,
-                status=l.status,
-                employee_name=l.employee.name if l.employee else None,
-                created_at=getattr(l, "created_at", None),
-            )
-            for l in pending_leaves_all
-        ]
-        today = date.today()
-        compliance_due = db.query(CompliancePolicy).filter(CompliancePolicy.due_date >= today).count()
-        compliance_overdue = db.query(CompliancePolicy).filter(CompliancePolicy.due_date < today).count()
-        total_learning = db.query(LearningContent).count()
-        completed_learning = db.query(UserLearningProgress).filter(UserLearningProgress.status == "completed").count()
-        learning_pct = min(100, round(100 * completed_learning / total_learning, 0)) if total_learning else 0
-        open_complaints = (
-            db.query(Complaint).filter(Complaint.status.in_(["Open", "In Progress"])).order_by(Complaint.created_at.desc()).all()
+        for c in open_complaints
+    ]}
+
+
+@composer.widget("team", roles=["manager"])
+async def _team(current_user: Principal, db: AsyncSession) -> dict:
+    today = date.today()
+    # Roster and today's leave in one query: the correlated subquery is an
+    # index seek on (employee_id, from_date) per member, not a round trip.
+    current_leave = (
+        select(LeaveRequest.reason)
+        .where(
+            LeaveRequest.employee_id == User.id,
+            LeaveRequest.status == "Approved",
+            LeaveRequest.from_date <= today,
+            LeaveRequest.to_date >= today
         )
-        dashboard_data.pending_complaints = [
-            ComplaintResponse(
-                id=c.id,
-                employee_id=c.employee_id,
-                subject=c.subject,
-                description=c.description,
-                status=c.status,
-                created_at=getattr(c, "created_at", None),
-            )
-            for c in open_complaints[:20]
-        ]
-        ai_insights = []
-        if len(pending_leaves_all) > 5:
-            ai_insights.append(f"{len(pending_leaves_all)} leave requests pending approval across the organization.")
-        if compliance_overdue > 0:
-            ai_insights.append(f"{compliance_overdue} compliance policy/policies overdue.")
-        if open_complaints:
-            ai_insights.append(f"{len(open_complaints)} employee complaint(s) open. Review in Complaints tab.")
-        dashboard_data.recommendations = {
-            "total_employees": total_employees,
-            "pending_leaves_count": len(pending_leaves_all),
-            "compliance_due": compliance_due,
-            "compliance_overdue": compliance_overdue,
-            "learning_completion_pct": learning_pct,
-            "pending_complaints_count": len(open_complaints),
-            "ai_insights": ai_insights[:5],
-        }
-
-    elif current_user.role == "manager":
-        team_members = db.query(User).filter(
-            User.department == current_user.department,
-            User.role == "employee"
-        ).all()
-        
-        today = date.today()
-        current_year = datetime.now().year
-        
-        team_members_with_status = []
-        for u in team_members:
-            current_leave = db.query(LeaveRequest).filter(
-                LeaveRequest.employee_id == u.id,
-                LeaveRequest.status == "Approved",
-                LeaveRequest.from_date <= today,
-                LeaveRequest.to_date >= today
-            ).first()
-            
-            availability_status = "On Leave" if current_leave else "Available"
-            
-            member_data = {
-                "id": u.id,
-                "name": u.name,
-                "email": u.email,
-                "role": u.role,
-                "department": u.department,
-                "skills": json.loads(u.skills) if u.skills else [],
-                "availability_status": availability_status,
-                "current_leave": current_leave.reason if current_leave else None
-            }
-            team_members_with_status.append(member_data)
-        
-        dashboard_data.team_members = [
+        .limit(1)
+        .scalar_subquery()
+    )
+    team_members = (await db.execute(
+        select(User.id, User.name, User.email, User.role, User.department, User.skills,
+               current_leave.label("current_leave"))
+        .filter(User.department == current_user.department, User.role == "employee")
+    )).all()
+    on_leave_count = sum(1 for u in team_members if u.current_leave is not None)
+    return {
+        "team_members": [
             UserResponse(
-                id=m["id"],
-                name=m["name"],
-                email=m["email"],
-                role=m["role"],
-                department=m["department"],
-                skills=m["skills"]
-            ) for m in team_members_with_status
-        ]
-        
-        apply_auto_approvals(db)
-        pending_leaves = db.query(LeaveRequest).filter(
+                id=u.id,
+                name=u.name,
+                email=u.email,
+                role=u.role,
+                department=u.department,
+                skills=json.loads(u.skills) if u.skills else []
+            ) for u in team_members
+        ],
+        "recommendations": {
+            "total_team_size": len(team_members),
+            "on_leave_count": on_leave_count,
+            "available_count": len(team_members) - on_leave_count,
+        },
+    }
+
+
+@composer.widget("team_pending_leaves", roles=["manager"], flag="show_leaves")
+async def _team_pending_leaves(current_user: Principal, db: AsyncSession) -> dict:
+    pending_leaves = (await db.execute(
+        select(LeaveRequest).join(User).options(contains_eager(LeaveRequest.employee)).filter(
             LeaveRequest.department == current_user.department,
             LeaveRequest.status == "Pending"
-        ).join(User).all()
-        dashboard_data.pending_leaves = [
-            LeaveRequestResponse(
-                id=l.id,
-                employee_id=l.employee_id,
-                department=l.department,
-                from_date=l.from_date,
-                to_date=l.to_date,
-                reason=l.reason,
-                status=l.status,
-                employee_name=l.employee.name,
-                created_at=getattr(l, "created_at", None),
-            ) for l in pending_leaves
-        ]
-        
-        team_stats = {
-            "total_team_size": len(team_members),
-            "on_leave_count": len([m for m in team_members_with_status if m["availability_status"] == "On Leave"]),
-            "available_count": len([m for m in team_members_with_status if m["availability_status"] == "Available"]),
-            "pending_approvals": len(pending_leaves)
-        }
-        dashboard_data.recommendations = team_stats
-    
-    return dashboard_data
+        )
+    )).scalars().all()
+    return {
+        "pending_leaves": [_leave_response(l) for l in pending_leaves],
+        "recommendations": {"pending_approvals": len(pending_leaves)},
+    }
 
 
 @router.post("/config", response_model=DashboardConfigResponse)
-def update_dashboard_config(
+async def update_dashboard_config(
     config_update: DashboardConfigUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    config = db.query(DashboardConfig).filter(DashboardConfig.user_id == current_user.id).first()
+    config = await db.get(DashboardConfig, current_user.id)
     if not config:
         config = DashboardConfig(user_id=current_user.id)
         db.add(config)
@@ -220,8 +228,8 @@ def update_dashboard_config(
     set_if("show_career")
     set_if("show_wellness")
     
-    db.commit()
-    db.refresh(config)
+    await db.commit()
+    await db.refresh(config)
     def get_show(c, key, default=True):
         return getattr(c, key, default) if c else default
     return DashboardConfigResponse(
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.database import get_db, get_async_db
 from app.models import User, LearningContent, UserLearningProgress, UserLearningAssignment
 from app.schemas import (
     LearningContentResponse,
@@ -8,7 +10,7 @@ from app.schemas import (
     LearningProgressUpdate,
     AssignmentResponse,
 )
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_current_user_async
 from datetime import datetime
 import json
 
@@ -37,28 +39,27 @@ def _content_to_response(c: LearningContent) -> LearningContentResponse:
 
 
 @router.get("/catalog", response_model=list[LearningContentResponse])
-def get_catalog(
+async def get_catalog(
     level: str | None = Query(None, description="Filter by level"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    q = db.query(LearningContent)
+    q = select(LearningContent)
     if level:
         q = q.filter(LearningContent.level == level)
-    items = q.all()
+    items = (await db.execute(q)).scalars().all()
     return [_content_to_response(c) for c in items]
 
 
 @router.get("/progress", response_model=list[LearningProgressResponse])
-def get_progress(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_progress(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rows = (
-        db.query(UserLearningProgress)
+    rows = (await db.execute(
+        select(UserLearningProgress)
         .filter(UserLearningProgress.user_id == current_user.id)
-        .all()
-    )
+    )).scalars().all()
     return [
         LearningProgressResponse(
             learning_content_id=r.learning_content_id,
@@ -70,22 +71,18 @@ def get_progress(
 
 
 @router.get("/assigned", response_model=list[AssignmentResponse])
-def get_assigned(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+async def get_assigned(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rows = (
-        db.query(UserLearningAssignment)
+    rows = (await db.execute(
+        select(UserLearningAssignment)
+        .options(selectinload(UserLearningAssignment.learning_content))
         .filter(UserLearningAssignment.user_id == current_user.id)
-        .all()
-    )
+    )).scalars().all()
     out = []
     for r in rows:
-        content = (
-            db.query(LearningContent)
-            .filter(LearningContent.id == r.learning_content_id)
-            .first()
-        )
+        content = r.learning_content
         out.append(
             AssignmentResponse(
                 id=r.id,
@@ -1,69 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import LeaveRequest, User, LeaveBalance
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.exc import StaleDataError
+from app.config import settings
+from app.database import get_db, get_async_db
+from app.models import LeaveRequest, User
 from app.schemas import (
     LeaveRequestCreate, LeaveRequestResponse, LeaveApprovalRequest,
     LeaveBalanceResponse, TeamCalendarResponse, CalendarEvent,
-    BulkLeaveApprovalRequest
+    BulkLeaveApprovalRequest, BulkLeaveApprovalItem, BulkLeaveApprovalResponse,
+    OccupancyResponse, DepartmentOccupancy, OccupancyWindow, LeaveApplyResponse, LeaveOverlap
+)
+from app.dependencies import (
+    Principal, get_current_principal, get_current_principal_async, require_role, require_role_async
+)
+from app.events import LEAVE_CHANGED, publish
+from app.leave_export import (
+    ICS_FOOTER, calendar_validators, export_query, http_date, ics_header, not_modified,
+    render_csv, render_csv_header, render_ics, stream_rows
+)
+from app.leave_index import leave_index
+from app.leave_ledger import DEFAULT_ALLOWANCE, balances_query, debit_leaves
+from app.org_stats import adjust_org_stats
+from app.working_days import working_days
+from app.leave_intervals import (
+    conflict_threshold, daily_headcount, daily_headcount_by_group, from_day,
+    intervals_touching, merge_overlapping, runs, to_days
 )
-from app.dependencies import get_current_user, require_role
 from datetime import date, datetime, timedelta
 from typing import Optional, List
 import json
+import numpy as np
 
 router = APIRouter(prefix="/leave", tags=["leave"])
 
 AUTO_APPROVE_MINUTES = 5
-
-
-def _parse_created_at(created):
-    if created is None:
-        return None
-    if isinstance(created, datetime):
-        return created.replace(tzinfo=None) if created.tzinfo else created
-    if isinstance(created, str):
-        try:
-            dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            return dt.replace(tzinfo=None) if dt.tzinfo else dt
-        except Exception:
-            return None
-    return None
+OCCUPANCY_MAX_DAYS = 731
+EXPORT_DEFAULT_DAYS = 365
+# Page sizes for the keyset-paginated lists; follow X-Next-Cursor for more.
+LEAVE_PAGE_DEFAULT = 50
+LEAVE_PAGE_MAX = 500
+BALANCE_PAGE_DEFAULT = 100
+BALANCE_PAGE_MAX = 1000
 
 
 def apply_auto_approvals(db: Session):
-    """Auto-approve Pending leaves older than AUTO_APPROVE_MINUTES."""
+    """Auto-approve Pending leaves older than AUTO_APPROVE_MINUTES.
+
+    Runs as a background job (registered with app.scheduler in app.main), so
+    request handlers never take the write lock for it. One UPDATE approves
+    every qualifying leave and returns it, and one executemany appends the
+    matching ledger debits.
+    """
     now = datetime.utcnow()
     threshold = now - timedelta(minutes=AUTO_APPROVE_MINUTES)
-    leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.status == "Pending",
-        LeaveRequest.created_at.isnot(None),
+    approved = db.execute(
+        update(LeaveRequest)
+        .where(LeaveRequest.status == "Pending", LeaveRequest.created_at <= threshold)
+        .values(status="Approved", version=LeaveRequest.version + 1)
+        .returning(
+            LeaveRequest.id, LeaveRequest.employee_id, LeaveRequest.department,
+            LeaveRequest.from_date, LeaveRequest.to_date
+        )
     ).all()
-    current_year = now.year
-    for leave in leaves:
-        created = _parse_created_at(leave.created_at)
-        if created is None or created > threshold:
-            continue
-        leave.status = "Approved"
-        balance = db.query(LeaveBalance).filter(
-            LeaveBalance.user_id == leave.employee_id,
-            LeaveBalance.year == current_year,
-        ).first()
-        if balance:
-            days_diff = (leave.to_date - leave.from_date).days + 1
-            balance.used_leaves += days_diff
-            balance.remaining_leaves = balance.total_leaves - balance.used_leaves
-        else:
-            days_diff = (leave.to_date - leave.from_date).days + 1
-            new_balance = LeaveBalance(
-                user_id=leave.employee_id,
-                total_leaves=20,
-                used_leaves=days_diff,
-                remaining_leaves=20 - days_diff,
-                year=current_year,
-            )
-            db.add(new_balance)
+    debit_leaves(db, approved, now.year)
+    adjust_org_stats(db, pending_leaves=-len(approved))
     db.commit()
+    # The bulk UPDATE bypasses the ORM events that keep the index current.
+    if approved:
+        leave_index.invalidate({row.department for row in approved})
+    for row in approved:
+        publish(LEAVE_CHANGED, employee_id=row.employee_id, department=row.department)
+
+
+def _retry_on_conflict(db: Session, operation):
+    """Run ``operation`` (read, check, write, commit), re-running it on a lost race.
+
+    LeaveRequest and LeaveBalance carry a version column, so a flush that
+    updates a row someone else changed since we read it raises StaleDataError
+    instead of overwriting it. The transaction is rolled back and the
+    operation runs again on fresh rows, where its own checks (e.g. "not
+    pending") now see the other writer's result.
+    """
+    for _ in range(settings.leave_update_attempts):
+        try:
+            return operation()
+        except StaleDataError:
+            db.rollback()
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Leave request was changed by another request, please retry"
+    )
 
 
 def leave_to_response(l) -> LeaveRequestResponse:
@@ -80,12 +109,51 @@ def leave_to_response(l) -> LeaveRequestResponse:
     )
 
 
-@router.post("/apply", response_model=LeaveRequestResponse)
+def _apply_conflicts(db: Session, department: str, employee_id: int, from_date: date, to_date: date) -> dict:
+    """Teammates' open leaves overlapping a new request and the resulting peak.
+
+    Served from leave_index; the peak counts distinct people (the applicant
+    included) on the busiest working day of ``[from_date, to_date]``.
+    """
+    overlaps = leave_index.overlapping(db, department, from_date, to_date)
+    members = leave_index.members(db, department)
+    origin = from_date.toordinal()
+    length = (to_date - from_date).days + 1
+    keys, starts, ends = merge_overlapping(
+        np.array([o.employee_id for o in overlaps] + [employee_id], dtype=np.int64),
+        np.array([o.from_day for o in overlaps] + [origin], dtype=np.int64) - origin,
+        np.array([o.to_day for o in overlaps] + [to_date.toordinal()], dtype=np.int64) - origin,
+    )
+    counts = daily_headcount(starts, ends, length)
+    working = working_days.is_working_day(db, department, (from_date + timedelta(days=i) for i in range(length)))
+    peak = int(counts[working].max(initial=0))
+    headcount = len(members)
+    return dict(
+        overlapping=[
+            LeaveOverlap(
+                leave_id=o.leave_id,
+                employee_id=o.employee_id,
+                employee_name=members.get(o.employee_id),
+                from_date=o.from_date,
+                to_date=o.to_date,
+                status=o.status,
+            )
+            for o in overlaps if o.employee_id != employee_id
+        ],
+        headcount=headcount,
+        peak_on_leave=peak,
+        capacity_pct=round(max(0.0, 100.0 * (headcount - peak) / headcount), 1) if headcount else 0.0,
+        has_conflict=peak >= conflict_threshold(department),
+    )
+
+
+@router.post("/apply", response_model=LeaveApplyResponse)
 def apply_for_leave(
     leave_data: LeaveRequestCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
+    """Submit a leave request and report who else in the department is off then."""
     if current_user.role not in ["employee", "manager"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -98,6 +166,9 @@ def apply_for_leave(
             detail="From date must be before or equal to to date"
         )
     
+    conflicts = _apply_conflicts(
+        db, current_user.department, current_user.id, leave_data.from_date, leave_data.to_date
+    )
     new_leave = LeaveRequest(
         employee_id=current_user.id,
         department=current_user.department,
@@ -110,125 +181,156 @@ def apply_for_leave(
     db.add(new_leave)
     db.commit()
     db.refresh(new_leave)
-    return leave_to_response(new_leave)
+    return LeaveApplyResponse(**leave_to_response(new_leave).model_dump(), **conflicts)
 
 
 @router.delete("/my/{leave_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_my_leave(
     leave_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    leave = db.query(LeaveRequest).filter(
-        LeaveRequest.id == leave_id,
-        LeaveRequest.employee_id == current_user.id,
-    ).first()
-    if not leave:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Leave request not found",
-        )
-    if leave.status != "Pending":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only pending leave requests can be deleted",
-        )
-    db.delete(leave)
-    db.commit()
+    def delete():
+        leave = db.query(LeaveRequest).filter(
+            LeaveRequest.id == leave_id,
+            LeaveRequest.employee_id == current_user.id,
+        ).first()
+        if not leave:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Leave request not found",
+            )
+        if leave.status != "Pending":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only pending leave requests can be deleted",
+            )
+        db.delete(leave)
+        db.commit()
+
+    _retry_on_conflict(db, delete)
     return None
 
 
+def _leave_rows_query():
+    """Leave columns plus the employee's name, as one joined projection."""
+    return select(
+        LeaveRequest.id,
+        LeaveRequest.employee_id,
+        LeaveRequest.department,
+        LeaveRequest.from_date,
+        LeaveRequest.to_date,
+        LeaveRequest.reason,
+        LeaveRequest.status,
+        LeaveRequest.created_at,
+        User.name.label("employee_name"),
+    ).join(User, User.id == LeaveRequest.employee_id)
+
+
+def _decode_leave_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        from_date, leave_id = cursor.split("_")
+        return date.fromisoformat(from_date), int(leave_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def _leaves_page(
+    db: AsyncSession, query, response: Response,
+    cursor: Optional[str], limit: int, include_total: bool
+):
+    """Newest-first page of a _leave_rows_query, keyed on (from_date, id).
+
+    A full page sets X-Next-Cursor; pass it back as ``cursor`` to continue
+    from the last row, so every page is an index range scan however deep it
+    is. ``include_total`` adds X-Total-Count for the unpaged query.
+    """
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        response.headers["X-Total-Count"] = str(total)
+    if cursor:
+        query = query.filter(tuple_(LeaveRequest.from_date, LeaveRequest.id) < _decode_leave_cursor(cursor))
+    query = query.order_by(LeaveRequest.from_date.desc(), LeaveRequest.id.desc()).limit(limit)
+    rows = (await db.execute(query)).mappings().all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = f"{rows[-1]['from_date'].isoformat()}_{rows[-1]['id']}"
+    return [LeaveRequestResponse(**row) for row in rows]
+
+
 @router.get("/my", response_model=list[LeaveRequestResponse])
-def get_my_leaves(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_leaves(
+    response: Response,
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(LEAVE_PAGE_DEFAULT, ge=1, le=LEAVE_PAGE_MAX),
+    include_total: bool = Query(False)
 ):
-    apply_auto_approvals(db)
-    leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.employee_id == current_user.id
-    ).order_by(LeaveRequest.from_date.desc()).all()
-    return [leave_to_response(l) for l in leaves]
+    query = _leave_rows_query().filter(LeaveRequest.employee_id == current_user.id)
+    return await _leaves_page(db, query, response, cursor, limit, include_total)
 
 
 @router.get("/pending", response_model=list[LeaveRequestResponse])
-def get_pending_leaves(
-    current_user: User = Depends(require_role("manager")),
-    db: Session = Depends(get_db)
+async def get_pending_leaves(
+    current_user: Principal = Depends(require_role_async("manager")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    apply_auto_approvals(db)
-    pending_leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.department == current_user.department,
-        LeaveRequest.status == "Pending"
-    ).join(User).order_by(LeaveRequest.from_date).all()
+    pending_leaves = (await db.execute(
+        select(LeaveRequest).join(User).options(contains_eager(LeaveRequest.employee)).filter(
+            LeaveRequest.department == current_user.department,
+            LeaveRequest.status == "Pending"
+        ).order_by(LeaveRequest.from_date)
+    )).scalars().all()
     return [leave_to_response(l) for l in pending_leaves]
 
 
 @router.post("/approve", response_model=LeaveRequestResponse)
 def approve_leave(
     approval: LeaveApprovalRequest,
-    current_user: User = Depends(require_role("manager")),
+    current_user: Principal = Depends(require_role("manager")),
     db: Session = Depends(get_db)
 ):
-    leave = db.query(LeaveRequest).filter(LeaveRequest.id == approval.leave_id).first()
-    if not leave:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Leave request not found"
-        )
-    
-    if leave.department != current_user.department:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Can only approve leaves from your department"
-        )
-    
-    if leave.status != "Pending":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Leave request is not pending"
-        )
-    
-    if approval.status not in ["Approved", "Rejected"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Status must be 'Approved' or 'Rejected'"
-        )
-    
-    leave.status = approval.status
-    db.commit()
-    db.refresh(leave)
-
-    if approval.status == "Approved":
-        current_year = datetime.now().year
-        balance = db.query(LeaveBalance).filter(
-            LeaveBalance.user_id == leave.employee_id,
-            LeaveBalance.year == current_year
-        ).first()
+    def approve():
+        leave = db.query(LeaveRequest).filter(LeaveRequest.id == approval.leave_id).first()
+        if not leave:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Leave request not found"
+            )
         
-        if balance:
-            days_diff = (leave.to_date - leave.from_date).days + 1
-            balance.used_leaves += days_diff
-            balance.remaining_leaves = balance.total_leaves - balance.used_leaves
-            db.commit()
-        else:
-            days_diff = (leave.to_date - leave.from_date).days + 1
-            new_balance = LeaveBalance(
-                user_id=leave.employee_id,
-                total_leaves=20,
-                used_leaves=days_diff,
-                remaining_leaves=20 - days_diff,
-                year=current_year
+        if leave.department != current_user.department:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Can only approve leaves from your department"
             )
-            db.add(new_balance)
-            db.commit()
+        
+        if leave.status != "Pending":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Leave request is not pending"
+            )
+        
+        if approval.status not in ["Approved", "Rejected"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Status must be 'Approved' or 'Rejected'"
+            )
+        
+        leave.status = approval.status
+        if approval.status == "Approved":
+            debit_leaves(db, [leave], datetime.now().year)
+        db.commit()
+        db.refresh(leave)
 
-    return leave_to_response(leave)
+        return leave_to_response(leave)
+
+    return _retry_on_conflict(db, approve)
 
 
 @router.get("/team-calendar", response_model=TeamCalendarResponse)
-def get_team_calendar(
-    current_user: User = Depends(require_role("manager")),
-    db: Session = Depends(get_db),
+async def get_team_calendar(
+    current_user: Principal = Depends(require_role_async("manager")),
+    db: AsyncSession = Depends(get_async_db),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None)
 ):
@@ -237,18 +339,16 @@ def get_team_calendar(
     if not end_date:
         end_date = start_date + timedelta(days=90)
     
-    team_leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.department == current_user.department,
-        LeaveRequest.from_date <= end_date,
-        LeaveRequest.to_date >= start_date
-    ).join(User).all()
-    
-    events = []
-    date_employee_map = {}
-    conflicts = []
+    team_leaves = (await db.execute(
+        select(LeaveRequest).join(User).options(contains_eager(LeaveRequest.employee)).filter(
+            LeaveRequest.department == current_user.department,
+            LeaveRequest.from_date <= end_date,
+            LeaveRequest.to_date >= start_date
+        )
+    )).scalars().all()
     
-    for leave in team_leaves:
-        event = CalendarEvent(
+    events = [
+        CalendarEvent(
             leave_id=leave.id,
             employee_id=leave.employee_id,
             employee_name=leave.employee.name,
@@ -257,85 +357,231 @@ def get_team_calendar(
             reason=leave.reason,
             status=leave.status
         )
-        
-        current_date = leave.from_date
-        while current_date <= leave.to_date:
-            if current_date not in date_employee_map:
-                date_employee_map[current_date] = []
-            date_employee_map[current_date].append(leave.employee_id)
-            current_date += timedelta(days=1)
-        
-        events.append(event)
-    
-    for event in events:
-        current_date = event.from_date
-        while current_date <= event.to_date:
-            if len(date_employee_map.get(current_date, [])) > 1:
-                event.has_conflict = True
-                conflict_date = current_date.isoformat()
-                if conflict_date not in [c.get("date") for c in conflicts]:
-                    conflicts.append({
-                        "date": conflict_date,
-                        "employee_count": len(date_employee_map[current_date])
-                    })
-            current_date += timedelta(days=1)
+        for leave in team_leaves
+    ]
+    conflicts = []
+    if events:
+        # Count over the full span of the fetched leaves, so a leave that
+        # starts before the window still sees conflicts on its earlier days.
+        starts = to_days(e.from_date for e in events)
+        ends = to_days(e.to_date for e in events)
+        origin = starts.min()
+        counts = daily_headcount(starts - origin, ends - origin, int(ends.max() - origin) + 1)
+        conflict_days = counts >= conflict_threshold(current_user.department)
+        for event, has_conflict in zip(events, intervals_touching(conflict_days, starts - origin, ends - origin)):
+            event.has_conflict = bool(has_conflict)
+        conflicts = [
+            {"date": from_day(origin + i).isoformat(), "employee_count": int(counts[i])}
+            for i in np.flatnonzero(conflict_days)
+        ]
     
     return TeamCalendarResponse(events=events, conflicts=conflicts)
 
 
+def _export_response(
+    request: Request, db: Session, department: str, start_date: Optional[date], end_date: Optional[date],
+    media_type: str, filename: str, header: str, render, footer: str = ""
+):
+    """Stream ``export_query`` through ``render``, or answer 304 if the client's copy is current."""
+    if not start_date:
+        start_date = date.today()
+    if not end_date:
+        end_date = start_date + timedelta(days=EXPORT_DEFAULT_DAYS)
+    etag, last_modified = calendar_validators(db, f"{filename}|{start_date}|{end_date}", department)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if not_modified(request.headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        stream_rows(export_query(department, start_date, end_date), render, header, footer),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get("/export.ics")
+def export_team_ics(
+    request: Request,
+    current_user: Principal = Depends(require_role("manager")),
+    db: Session = Depends(get_db),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None)
+):
+    """Team leave as an iCalendar feed for calendar clients (conditional GET supported)."""
+    return _export_response(
+        request, db, current_user.department, start_date, end_date,
+        "text/calendar; charset=utf-8", "team-leave.ics",
+        ics_header(current_user.department), render_ics, ICS_FOOTER,
+    )
+
+
+@router.get("/export.csv")
+def export_team_csv(
+    request: Request,
+    current_user: Principal = Depends(require_role("manager")),
+    db: Session = Depends(get_db),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None)
+):
+    """Team leave as CSV (conditional GET supported)."""
+    return _export_response(
+        request, db, current_user.department, start_date, end_date,
+        "text/csv; charset=utf-8", "team-leave.csv", render_csv_header(), render_csv,
+    )
+
+
+@router.get("/occupancy", response_model=OccupancyResponse)
+async def get_occupancy(
+    current_user: Principal = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    department: Optional[List[str]] = Query(None),
+    include_pending: bool = Query(False)
+):
+    """People on leave per day for each department, with capacity and peaks.
+
+    Managers get their own department; HR may pass any number of
+    ``department`` parameters and defaults to every department.
+    """
+    if current_user.role == "manager":
+        if department and set(department) != {current_user.department}:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Managers can only view their own department"
+            )
+        department = [current_user.department]
+    elif current_user.role != "hr":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Required role: manager or hr"
+        )
+    if not start_date:
+        start_date = date.today()
+    if not end_date:
+        end_date = start_date + timedelta(days=90)
+    length = (end_date - start_date).days + 1
+    if length < 1 or length > OCCUPANCY_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must cover 1 to {OCCUPANCY_MAX_DAYS} days"
+        )
+    statuses = ["Approved", "Pending"] if include_pending else ["Approved"]
+
+    headcount_query = select(User.department, func.count()).group_by(User.department)
+    if department:
+        headcount_query = headcount_query.filter(User.department.in_(department))
+    headcounts = dict((await db.execute(headcount_query)).all())
+    departments = sorted(set(department or headcounts))
+    index = {name: i for i, name in enumerate(departments)}
+
+    rows = (await db.execute(
+        select(LeaveRequest.department, LeaveRequest.employee_id, LeaveRequest.from_date, LeaveRequest.to_date)
+        .filter(
+            LeaveRequest.department.in_(departments),
+            LeaveRequest.status.in_(statuses),
+            LeaveRequest.from_date <= end_date,
+            LeaveRequest.to_date >= start_date
+        )
+    )).all()
+    origin = to_days([start_date])[0]
+    # One key per (department, employee) so overlapping requests count once.
+    stride = max((r.employee_id for r in rows), default=0) + 1
+    keys = np.array([index[r.department] * stride + r.employee_id for r in rows], dtype=np.int64)
+    keys, starts, ends = merge_overlapping(
+        keys, to_days(r.from_date for r in rows) - origin, to_days(r.to_date for r in rows) - origin
+    )
+    on_leave = daily_headcount_by_group(keys // stride, starts, ends, len(departments), length)
+
+    dates = [start_date + timedelta(days=i) for i in range(length)]
+    working = await db.run_sync(
+        lambda sync_db: {name: working_days.is_working_day(sync_db, name, dates) for name in departments}
+    )
+
+    result = []
+    for name, counts in zip(departments, on_leave):
+        headcount = headcounts.get(name, 0)
+        capacity = np.clip(100.0 * (headcount - counts) / headcount, 0, 100) if headcount else np.zeros(length)
+        peak = int(counts[working[name]].max(initial=0))
+        result.append(DepartmentOccupancy(
+            department=name,
+            headcount=headcount,
+            on_leave=counts.tolist(),
+            capacity_pct=np.round(capacity, 1).tolist(),
+            working_days=working[name].tolist(),
+            peak_on_leave=peak,
+            peak_windows=[
+                OccupancyWindow(
+                    from_date=start_date + timedelta(days=lo),
+                    to_date=start_date + timedelta(days=hi),
+                    on_leave=peak
+                )
+                for lo, hi in runs((counts == peak) & working[name])
+            ] if peak else [],
+        ))
+    return OccupancyResponse(start_date=start_date, end_date=end_date, statuses=statuses, departments=result)
+
+
+async def _balances_page(
+    db: AsyncSession, criteria: list, response: Response,
+    year: Optional[int], cursor: Optional[int], limit: int
+):
+    """Page of balances_query; a full page sets X-Next-Cursor to its last user id."""
+    if cursor is not None:
+        criteria.append(User.id > cursor)
+    query = balances_query(year or datetime.now().year, *criteria).limit(limit)
+    rows = (await db.execute(query)).mappings().all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["user_id"])
+    return [LeaveBalanceResponse(**row) for row in rows]
+
+
 @router.get("/balances", response_model=List[LeaveBalanceResponse])
-def get_team_leave_balances(
-    current_user: User = Depends(require_role("manager")),
-    db: Session = Depends(get_db)
+async def get_team_leave_balances(
+    response: Response,
+    current_user: Principal = Depends(require_role_async("manager")),
+    db: AsyncSession = Depends(get_async_db),
+    year: Optional[int] = Query(None),
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(BALANCE_PAGE_DEFAULT, ge=1, le=BALANCE_PAGE_MAX)
 ):
-    current_year = datetime.now().year
-    team_members = db.query(User).filter(
-        User.department == current_user.department,
-        User.role == "employee"
-    ).all()
-    
-    balances = []
-    for member in team_members:
-        balance = db.query(LeaveBalance).filter(
-            LeaveBalance.user_id == member.id,
-            LeaveBalance.year == current_year
-        ).first()
-        
-        if balance:
-            balances.append(LeaveBalanceResponse(
-                user_id=member.id,
-                user_name=member.name,
-                total_leaves=balance.total_leaves,
-                used_leaves=balance.used_leaves,
-                remaining_leaves=balance.remaining_leaves,
-                year=balance.year
-            ))
-        else:
-            balances.append(LeaveBalanceResponse(
-                user_id=member.id,
-                user_name=member.name,
-                total_leaves=20,
-                used_leaves=0,
-                remaining_leaves=20,
-                year=current_year
-            ))
-    
-    return balances
+    criteria = [User.department == current_user.department, User.role == "employee"]
+    return await _balances_page(db, criteria, response, year, cursor, limit)
+
+
+@router.get("/balances/org", response_model=List[LeaveBalanceResponse])
+async def get_org_leave_balances(
+    response: Response,
+    current_user: Principal = Depends(require_role_async("hr")),
+    db: AsyncSession = Depends(get_async_db),
+    year: Optional[int] = Query(None),
+    department: Optional[str] = Query(None),
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(BALANCE_PAGE_DEFAULT, ge=1, le=BALANCE_PAGE_MAX)
+):
+    """Balances for every employee and manager, optionally for one department."""
+    criteria = [User.role.in_(["employee", "manager"])]
+    if department:
+        criteria.append(User.department == department)
+    return await _balances_page(db, criteria, response, year, cursor, limit)
 
 
 @router.get("/history", response_model=List[LeaveRequestResponse])
-def get_leave_history(
-    current_user: User = Depends(require_role("manager")),
-    db: Session = Depends(get_db),
+async def get_leave_history(
+    response: Response,
+    current_user: Principal = Depends(require_role_async("manager")),
+    db: AsyncSession = Depends(get_async_db),
     status_filter: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    employee_id: Optional[int] = Query(None)
+    employee_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(LEAVE_PAGE_DEFAULT, ge=1, le=LEAVE_PAGE_MAX),
+    include_total: bool = Query(False)
 ):
-    apply_auto_approvals(db)
-    query = db.query(LeaveRequest).filter(
-        LeaveRequest.department == current_user.department
-    ).join(User)
+    query = _leave_rows_query().filter(LeaveRequest.department == current_user.department)
     if status_filter:
         query = query.filter(LeaveRequest.status == status_filter)
     if start_date:
@@ -344,60 +590,72 @@ def get_leave_history(
         query = query.filter(LeaveRequest.to_date <= end_date)
     if employee_id:
         query = query.filter(LeaveRequest.employee_id == employee_id)
-    leaves = query.order_by(LeaveRequest.from_date.desc()).all()
-    return [leave_to_response(l) for l in leaves]
+    return await _leaves_page(db, query, response, cursor, limit, include_total)
 
 
-@router.post("/bulk-approve")
+@router.post("/bulk-approve", response_model=BulkLeaveApprovalResponse)
 def bulk_approve_leaves(
     bulk_request: BulkLeaveApprovalRequest,
-    current_user: User = Depends(require_role("manager")),
+    current_user: Principal = Depends(require_role("manager")),
     db: Session = Depends(get_db)
 ):
+    """Approve or reject many leaves in one transaction.
+
+    Leaves that cannot be updated are reported in ``results`` and skipped
+    rather than failing the batch. Balances for every affected employee are
+    read with one IN query and approved days are summed per employee in memory.
+    """
     if bulk_request.status not in ["Approved", "Rejected"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Status must be 'Approved' or 'Rejected'"
         )
     
-    leaves = db.query(LeaveRequest).filter(
-        LeaveRequest.id.in_(bulk_request.leave_ids),
-        LeaveRequest.department == current_user.department,
-        LeaveRequest.status == "Pending"
-    ).all()
-    
-    if len(leaves) != len(bulk_request.leave_ids):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Some leave requests not found or already processed"
-        )
-    
-    current_year = datetime.now().year
-    updated_count = 0
-    
-    for leave in leaves:
-        leave.status = bulk_request.status
-        if bulk_request.status == "Approved":
-            balance = db.query(LeaveBalance).filter(
-                LeaveBalance.user_id == leave.employee_id,
-                LeaveBalance.year == current_year
-            ).first()
-            
-            if balance:
-                days_diff = (leave.to_date - leave.from_date).days + 1
-                balance.used_leaves += days_diff
-                balance.remaining_leaves = balance.total_leaves - balance.used_leaves
+    leave_ids = list(dict.fromkeys(bulk_request.leave_ids))
+
+    def apply_batch():
+        leaves = {l.id: l for l in db.query(LeaveRequest).filter(LeaveRequest.id.in_(leave_ids))}
+        results = {}
+        updates = []
+        for leave_id in leave_ids:
+            leave = leaves.get(leave_id)
+            if leave is None:
+                results[leave_id] = BulkLeaveApprovalItem(leave_id=leave_id, result="not_found")
+            elif leave.department != current_user.department:
+                results[leave_id] = BulkLeaveApprovalItem(leave_id=leave_id, result="other_department")
+            elif leave.status != "Pending":
+                results[leave_id] = BulkLeaveApprovalItem(leave_id=leave_id, result="not_pending", status=leave.status)
             else:
-                days_diff = (leave.to_date - leave.from_date).days + 1
-                new_balance = LeaveBalance(
-                    user_id=leave.employee_id,
-                    total_leaves=20,
-                    used_leaves=days_diff,
-                    remaining_leaves=20 - days_diff,
-                    year=current_year
-                )
-                db.add(new_balance)
-        updated_count += 1
-    
-    db.commit()
-    return {"message": f"Successfully updated {updated_count} leave requests", "updated_count": updated_count}
+                updates.append(leave)
+        
+        remaining_after = {}
+        if bulk_request.status == "Approved" and updates:
+            current_year = datetime.now().year
+            balances = db.execute(
+                balances_query(current_year, User.id.in_({leave.employee_id for leave in updates}))
+            ).mappings()
+            remaining = {b["user_id"]: b["remaining_leaves"] for b in balances}
+            for leave, days in zip(updates, debit_leaves(db, updates, current_year)):
+                # An employee missing from the query (e.g. a deleted user)
+                # starts from the default allowance instead of raising.
+                remaining[leave.employee_id] = remaining.get(leave.employee_id, DEFAULT_ALLOWANCE) - days
+                # Running balance, so each of an employee's leaves reports its own step.
+                remaining_after[leave.id] = remaining[leave.employee_id]
+        for leave in updates:
+            leave.status = bulk_request.status
+            results[leave.id] = BulkLeaveApprovalItem(
+                leave_id=leave.id,
+                result="updated",
+                status=leave.status,
+                remaining_leaves=remaining_after.get(leave.id)
+            )
+        
+        db.commit()
+        updated_count = len(updates)
+        return BulkLeaveApprovalResponse(
+            message=f"Successfully updated {updated_count} leave requests",
+            updated_count=updated_count,
+            results=[results[leave_id] for leave_id in leave_ids],
+        )
+
+    return _retry_on_conflict(db, apply_batch)
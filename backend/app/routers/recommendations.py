@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from app.database import get_db
+from sqlalchemy import or_, func, select
+from app.database import get_db, get_async_db
 from app.models import User, LearningContent, CompliancePolicy, UserAISuggestionProgress
 from app.schemas import (
     RecommendationResponse,
@@ -11,7 +13,7 @@ from app.schemas import (
     LearningPathStep,
     AISuggestionProgressUpdate,
 )
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_current_user_async
 from app.config import settings
 from datetime import date, datetime
 import json
@@ -317,50 +319,17 @@ def _create_role_based_learning_paths(
     return learning_paths
 
 
-@router.get("", response_model=RecommendationResponse)
-def get_recommendations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    user_skills = json.loads(current_user.skills) if current_user.skills else []
-    user_interests = json.loads(getattr(current_user, "interests", None) or "[]")
-    user_certs = json.loads(getattr(current_user, "certifications", None) or "[]")
-    user_prefs = json.loads(getattr(current_user, "career_preferences", None) or "{}")
-    career_goals = (user_prefs.get("goals") or []) if isinstance(user_prefs.get("goals"), list) else ([user_prefs.get("goals")] if user_prefs.get("goals") else [])
-    preferred_roles = (user_prefs.get("preferred_roles") or []) if isinstance(user_prefs.get("preferred_roles"), list) else ([user_prefs.get("preferred_roles")] if user_prefs.get("preferred_roles") else [])
-    
-    # Use career_preferences.current_role if available, otherwise use actual role
-    # This allows recommendations to reflect user's career aspirations
-    effective_role = user_prefs.get("current_role") or current_user.role
-    if effective_role and effective_role.strip():
-        effective_role = effective_role.strip().lower()
-        # Map common career role names to system roles
-        role_mapping = {
-            "manager": "manager",
-            "lead": "manager",
-            "senior": "employee",
-            "engineer": "employee",
-            "developer": "employee",
-            "hr": "hr",
-            "human resources": "hr",
-        }
-        for key, mapped_role in role_mapping.items():
-            if key in effective_role:
-                effective_role = mapped_role
-                break
-    else:
-        effective_role = current_user.role.lower()
+def _gpt_suggestions(position_str: str, skills_str: str, interests_str: str, goals_str: str):
+    """Ask GPT for personalized learning/certification suggestions.
 
-    # GPT-first: personalized learning + certification suggestions from profile
+    Returns (learning, certifications, summary, fallback, error_message). This
+    makes a blocking HTTP call, so async callers run it in the threadpool.
+    """
     ai_learning_suggestions = None
     ai_certification_suggestions = None
     ai_personalized_summary = None
     ai_fallback = True
     ai_error_message = None
-    position_str = f"{effective_role.title()} in {current_user.department}"
-    goals_str = ", ".join(career_goals[:5]) if career_goals else "none specified"
-    skills_str = ", ".join(s for s in user_skills[:15] if isinstance(s, str)) if user_skills else "none specified"
-    interests_str = ", ".join(i for i in user_interests[:15] if isinstance(i, str)) if user_interests else "none specified"
 
     if not (settings.api_key and settings.api_key.strip()):
         ai_error_message = "api_key_missing"
@@ -428,13 +397,64 @@ Provide 5-8 learning suggestions and 3-5 certification suggestions. Be specific
             ai_fallback = True
             ai_error_message = "gpt_error"
 
-    all_learning = db.query(LearningContent).all()
-    all_compliance = db.query(CompliancePolicy).filter(
+    return ai_learning_suggestions, ai_certification_suggestions, ai_personalized_summary, ai_fallback, ai_error_message
+
+
+@router.get("", response_model=RecommendationResponse)
+async def get_recommendations(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_skills = json.loads(current_user.skills) if current_user.skills else []
+    user_interests = json.loads(getattr(current_user, "interests", None) or "[]")
+    user_certs = json.loads(getattr(current_user, "certifications", None) or "[]")
+    user_prefs = json.loads(getattr(current_user, "career_preferences", None) or "{}")
+    career_goals = (user_prefs.get("goals") or []) if isinstance(user_prefs.get("goals"), list) else ([user_prefs.get("goals")] if user_prefs.get("goals") else [])
+    preferred_roles = (user_prefs.get("preferred_roles") or []) if isinstance(user_prefs.get("preferred_roles"), list) else ([user_prefs.get("preferred_roles")] if user_prefs.get("preferred_roles") else [])
+    
+    # Use career_preferences.current_role if available, otherwise use actual role
+    # This allows recommendations to reflect user's career aspirations
+    effective_role = user_prefs.get("current_role") or current_user.role
+    if effective_role and effective_role.strip():
+        effective_role = effective_role.strip().lower()
+        # Map common career role names to system roles
+        role_mapping = {
+            "manager": "manager",
+            "lead": "manager",
+            "senior": "employee",
+            "engineer": "employee",
+            "developer": "employee",
+            "hr": "hr",
+            "human resources": "hr",
+        }
+        for key, mapped_role in role_mapping.items():
+            if key in effective_role:
+                effective_role = mapped_role
+                break
+    else:
+        effective_role = current_user.role.lower()
+
+    # GPT-first: personalized learning + certification suggestions from profile
+    position_str = f"{effective_role.title()} in {current_user.department}"
+    goals_str = ", ".join(career_goals[:5]) if career_goals else "none specified"
+    skills_str = ", ".join(s for s in user_skills[:15] if isinstance(s, str)) if user_skills else "none specified"
+    interests_str = ", ".join(i for i in user_interests[:15] if isinstance(i, str)) if user_interests else "none specified"
+
+    (
+        ai_learning_suggestions,
+        ai_certification_suggestions,
+        ai_personalized_summary,
+        ai_fallback,
+        ai_error_message,
+    ) = await run_in_threadpool(_gpt_suggestions, position_str, skills_str, interests_str, goals_str)
+
+    all_learning = (await db.execute(select(LearningContent))).scalars().all()
+    all_compliance = (await db.execute(select(CompliancePolicy).filter(
         or_(
             func.lower(CompliancePolicy.department) == current_user.department.lower(),
             CompliancePolicy.department.ilike("all"),
         )
-    ).all()
+    ))).scalars().all()
 
     recommended_learning = []
     explanations = []
@@ -534,10 +554,10 @@ Provide 5-8 learning suggestions and 3-5 certification suggestions. Be specific
     if ai_learning_suggestions or ai_certification_suggestions:
         all_keys = [item["key"] for item in (ai_learning_suggestions or [])] + [item["key"] for item in (ai_certification_suggestions or [])]
         if all_keys:
-            rows = db.query(UserAISuggestionProgress).filter(
+            rows = (await db.execute(select(UserAISuggestionProgress).filter(
                 UserAISuggestionProgress.user_id == current_user.id,
                 UserAISuggestionProgress.suggestion_key.in_(all_keys),
-            ).all()
+            ))).scalars().all()
             progress_map = {r.suggestion_key: r.status for r in rows}
             for item in (ai_learning_suggestions or []):
                 item["status"] = progress_map.get(item["key"], "not_started")
@@ -619,9 +639,9 @@ def update_ai_suggestion_progress(
 
 
 @router.get("/team-compliance", response_model=RecommendationResponse)
-def get_team_compliance(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_team_compliance(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if current_user.role != "manager":
         raise HTTPException(
@@ -629,12 +649,12 @@ def get_team_compliance(
             detail="Only managers can access team compliance"
         )
     
-    all_compliance = db.query(CompliancePolicy).filter(
+    all_compliance = (await db.execute(select(CompliancePolicy).filter(
         or_(
             func.lower(CompliancePolicy.department) == current_user.department.lower(),
             CompliancePolicy.department.ilike("all"),
         )
-    ).all()
+    ))).scalars().all()
 
     compliance_list = list(all_compliance)
     compliance_list.sort(key=lambda x: x.due_date)
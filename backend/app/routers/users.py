@@ -9,7 +9,7 @@ import json
 from app.database import get_db
 from app.models import User, UserDocument
 from app.schemas import UserResponse, UserProfileUpdate, UserDocumentResponse
-from app.dependencies import get_current_user, require_role
+from app.dependencies import Principal, get_current_user, require_role
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -171,7 +171,7 @@ def get_user(
 
 @router.get("", response_model=List[UserResponse])
 def get_all_users(
-    current_user: User = Depends(require_role("hr")),
+    current_user: Principal = Depends(require_role("hr")),
     db: Session = Depends(get_db),
 ):
     users = db.query(User).all()
@@ -0,0 +1,112 @@
+"""In-process interval scheduler for background jobs.
+
+Each job runs on an asyncio task and executes its (sync) function on a worker
+thread with a fresh Session. When the API runs with several workers, every
+worker schedules every job but only the one holding the job's lease in
+``scheduler_leases`` executes it. A lease is renewed on each run and lasts
+the job's interval plus ``lease_seconds`` of slack, so the holder always
+renews it before it expires; another worker takes over only once the holder
+has missed a run.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    name: str
+    interval_seconds: float
+    func: Callable[[Session], None]
+    lease_seconds: float
+    last_run: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+class Scheduler:
+    def __init__(self, lease_seconds: float, session_factory=SessionLocal):
+        # Slack added to each job's interval to get its lease duration.
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[Session], None]) -> None:
+        self.jobs[name] = Job(name, interval_seconds, func, lease_seconds=interval_seconds + self.lease_seconds)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"job:{job.name}") for job in self.jobs.values()]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once, job)
+            except Exception as e:
+                job.last_error = str(e)
+                logger.exception("Scheduled job %s failed", job.name)
+            await asyncio.sleep(job.interval_seconds)
+
+    def run_once(self, job: Job) -> bool:
+        """Run ``job`` if this worker holds (or can take) its lease."""
+        db = self.session_factory()
+        try:
+            if not self._acquire_lease(db, job):
+                return False
+            job.func(db)
+            job.last_run = datetime.utcnow()
+            job.last_error = None
+            return True
+        finally:
+            db.close()
+
+    def _acquire_lease(self, db: Session, job: Job) -> bool:
+        name = job.name
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=job.lease_seconds)
+        renewed = db.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == name,
+                or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+            )
+            .values(holder=self.holder, expires_at=expires_at)
+        ).rowcount
+        if renewed:
+            db.commit()
+            return True
+        db.rollback()
+        try:
+            db.add(SchedulerLease(name=name, holder=self.holder, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            # Another worker holds a live lease.
+            db.rollback()
+            return False
+
+
+scheduler = Scheduler(lease_seconds=settings.scheduler_lease_seconds)
@@ -128,6 +128,37 @@ class ComplianceCategoryRulesByCategory(BaseModel):
     finance: List[ComplianceCategoryRuleResponse] = []
 
 
+class HolidayCreate(BaseModel):
+    date: date
+    name: str
+
+
+class HolidayResponse(BaseModel):
+    id: int
+    date: date
+    name: str
+    
+    class Config:
+        from_attributes = True
+
+
+class HolidayCalendarCreate(BaseModel):
+    name: str
+    department: Optional[str] = None  # None = default calendar for all departments
+    weekmask: str = "1111100"  # Mon..Sun, 1 = working day
+
+
+class HolidayCalendarResponse(BaseModel):
+    id: int
+    name: str
+    department: Optional[str] = None
+    weekmask: str
+    holidays: List[HolidayResponse] = []
+    
+    class Config:
+        from_attributes = True
+
+
 class ComplaintCreate(BaseModel):
     subject: str
     description: str
@@ -304,11 +335,64 @@ class TeamCalendarResponse(BaseModel):
     conflicts: List[dict] = []
 
 
+class OccupancyWindow(BaseModel):
+    from_date: date
+    to_date: date
+    on_leave: int
+
+
+class DepartmentOccupancy(BaseModel):
+    department: str
+    headcount: int
+    on_leave: List[int] = []  # people on leave per day, starting at start_date
+    capacity_pct: List[float] = []  # share of headcount available per day
+    working_days: List[bool] = []  # per day, by the department's holiday calendar
+    peak_on_leave: int = 0  # highest on_leave over working days
+    peak_windows: List[OccupancyWindow] = []  # runs of working days at peak_on_leave
+
+
+class OccupancyResponse(BaseModel):
+    start_date: date
+    end_date: date
+    statuses: List[str]
+    departments: List[DepartmentOccupancy] = []
+
+
+class LeaveOverlap(BaseModel):
+    leave_id: int
+    employee_id: int
+    employee_name: Optional[str] = None
+    from_date: date
+    to_date: date
+    status: str
+
+
+class LeaveApplyResponse(LeaveRequestResponse):
+    overlapping: List[LeaveOverlap] = []  # teammates' open leaves during the request
+    headcount: int = 0
+    peak_on_leave: int = 0  # most people on leave on one day of the request, applicant included
+    capacity_pct: float = 100.0  # share of headcount available on that day
+    has_conflict: bool = False  # peak_on_leave reaches the department's conflict threshold
+
+
 class BulkLeaveApprovalRequest(BaseModel):
     leave_ids: List[int]
     status: str
 
 
+class BulkLeaveApprovalItem(BaseModel):
+    leave_id: int
+    result: str  # updated, not_found, other_department, not_pending
+    status: Optional[str] = None  # leave status after the request
+    remaining_leaves: Optional[int] = None  # employee's balance after this leave (approvals only)
+
+
+class BulkLeaveApprovalResponse(BaseModel):
+    message: str
+    updated_count: int
+    results: List[BulkLeaveApprovalItem] = []
+
+
 class CareerRoleInfo(BaseModel):
     title: str
     department: str
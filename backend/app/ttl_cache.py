@@ -0,0 +1,76 @@
+"""Thread-safe LRU cache with a per-entry TTL.
+
+The shared core of identity_cache and dashboard_cache. Every way an entry can
+leave the cache (expiry, LRU overflow, ``invalidate``, ``clear``) goes
+through ``_drop``, which calls ``_evicted`` so subclasses can keep their own
+bookkeeping about entries in step. Subclasses that need several operations
+under one lock use the ``_get``/``_put``/``_drop`` helpers, which expect
+``_lock`` to be held.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._put(key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: Hashable, value: Any) -> None:
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._evicted(key, entry[1])
+
+    def _evicted(self, key: Hashable, value: Any) -> None:
+        """Called with the lock held for every entry that leaves the cache."""
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,144 @@
+"""Working-day counts for leave, using per-department holiday calendars.
+
+Each HolidayCalendar is compiled once into a ``numpy.busdaycalendar`` (its
+weekmask plus a sorted array of holiday dates) and cached, so counting any
+number of intervals costs one vectorized ``numpy.busday_count`` call per
+calendar involved. Departments without a calendar of their own use the
+default calendar (department NULL), or a plain Monday-Friday week when there
+is none. Edits through the ORM reload the affected departments' calendars
+once they commit; other workers pick them up after
+``holiday_calendar_ttl_seconds``.
+"""
+import threading
+import time
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import event, false, inspect, or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.models import Holiday, HolidayCalendar
+
+DEFAULT_WEEKMASK = "1111100"
+
+
+class WorkingDayCalendars:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._calendars: Optional[dict] = None
+        self._stale: set = set()
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, departments: Optional[Iterable[Optional[str]]] = None) -> None:
+        """Reload ``departments`` (None key: the default calendar) on next use, or everything."""
+        with self._lock:
+            self._generation += 1
+            if departments is None:
+                self._calendars = None
+            else:
+                self._stale.update(departments)
+
+    def _load(self, db: Session) -> dict:
+        with self._lock:
+            calendars, stale, generation = self._calendars, set(self._stale), self._generation
+            if calendars is not None and self._expires_at <= time.monotonic():
+                calendars = None
+        if calendars is not None and not stale:
+            return calendars
+        full = calendars is None
+        query = select(HolidayCalendar).options(selectinload(HolidayCalendar.holidays))
+        if full:
+            calendars = {None: np.busdaycalendar(weekmask=DEFAULT_WEEKMASK)}
+        else:
+            # Only the departments whose calendars changed are read again.
+            calendars = {d: c for d, c in calendars.items() if d not in stale}
+            calendars.setdefault(None, np.busdaycalendar(weekmask=DEFAULT_WEEKMASK))
+            named = [d for d in stale if d is not None]
+            query = query.where(or_(
+                HolidayCalendar.department.in_(named),
+                HolidayCalendar.department.is_(None) if None in stale else false(),
+            ))
+        for row in db.execute(query).scalars().all():
+            calendars[row.department] = np.busdaycalendar(
+                weekmask=row.weekmask or DEFAULT_WEEKMASK,
+                holidays=np.array([h.date for h in row.holidays], dtype="datetime64[D]"),
+            )
+        with self._lock:
+            # An invalidation while we were reading may have made this stale.
+            if generation == self._generation:
+                self._calendars = calendars
+                self._stale.clear()
+                if full:
+                    self._expires_at = time.monotonic() + self.ttl_seconds
+        return calendars
+
+    def calendar(self, db: Session, department: Optional[str]) -> np.busdaycalendar:
+        calendars = self._load(db)
+        return calendars.get(department, calendars[None])
+
+    def count(
+        self, db: Session, departments: Iterable[str], starts: Iterable[date], ends: Iterable[date]
+    ) -> np.ndarray:
+        """Working days in each inclusive ``[start, end]``, by its department's calendar."""
+        departments = np.asarray(list(departments), dtype=object)
+        starts = np.asarray(list(starts), dtype="datetime64[D]")
+        ends = np.asarray(list(ends), dtype="datetime64[D]")
+        days = np.zeros(len(starts), dtype=np.int64)
+        for department in set(departments.tolist()):
+            rows = departments == department
+            days[rows] = np.busday_count(
+                starts[rows], ends[rows] + 1, busdaycal=self.calendar(db, department)
+            )
+        return days
+
+    def is_working_day(self, db: Session, department: Optional[str], dates: Iterable[date]) -> np.ndarray:
+        return np.is_busday(np.asarray(list(dates), dtype="datetime64[D]"), busdaycal=self.calendar(db, department))
+
+
+working_days = WorkingDayCalendars(ttl_seconds=settings.holiday_calendar_ttl_seconds)
+
+
+_CHANGES_KEY = "working_day_calendar_changes"
+
+
+def _record(session: Optional[Session], departments) -> None:
+    if session is not None:
+        session.info.setdefault(_CHANGES_KEY, set()).update(departments)
+
+
+@event.listens_for(HolidayCalendar, "after_insert")
+@event.listens_for(HolidayCalendar, "after_update")
+@event.listens_for(HolidayCalendar, "after_delete")
+def _record_calendar(mapper, connection, target):
+    # Renaming a calendar's department affects the old department too.
+    history = inspect(target).attrs.department.history
+    _record(Session.object_session(target), {target.department, *(history.deleted or ())})
+
+
+@event.listens_for(Holiday, "after_insert")
+@event.listens_for(Holiday, "after_update")
+@event.listens_for(Holiday, "after_delete")
+def _record_holiday(mapper, connection, target):
+    calendar_ids = {target.calendar_id, *(inspect(target).attrs.calendar_id.history.deleted or ())}
+    departments = connection.execute(
+        select(HolidayCalendar.department).where(HolidayCalendar.id.in_(calendar_ids))
+    ).scalars().all()
+    _record(Session.object_session(target), departments)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Evicting only once the change is visible keeps another thread from
+    # reloading (and caching) the calendars as they were before it.
+    departments = session.info.pop(_CHANGES_KEY, None)
+    if departments:
+        working_days.invalidate(departments)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
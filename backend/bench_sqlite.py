@@ -0,0 +1,162 @@
+"""Read/write concurrency benchmark for the SQLite connection settings.
+
+Runs the same mixed workload (managers approving leaves while others load
+pending lists) against a scratch database twice: once with SQLite's default
+rollback journal and once with the PRAGMAs from Settings applied through
+app.database.configure_sqlite. It then times opening a session and running
+one query on the engines the app builds (create_app_engine and
+create_app_async_engine), which is what every request pays before its first
+real query.
+
+    python bench_sqlite.py [--seconds 5] [--readers 8] [--writers 2] [--sessions 500]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import Base, configure_sqlite, create_app_async_engine, create_app_engine, sqlite_pragmas
+from app.models import LeaveRequest, User
+
+DEPARTMENTS = ["Engineering", "Sales", "HR", "Finance"]
+
+
+def _seed(engine, rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "name": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x",
+             "role": "employee", "department": DEPARTMENTS[i % len(DEPARTMENTS)]}
+            for i in range(1, 201)
+        ])
+        conn.execute(LeaveRequest.__table__.insert(), [
+            {"employee_id": 1 + i % 200, "department": DEPARTMENTS[i % len(DEPARTMENTS)],
+             "from_date": date(2025, 1 + i % 12, 1), "to_date": date(2025, 1 + i % 12, 3),
+             "reason": "bench", "status": "Pending", "created_at": datetime(2025, 1, 1)}
+            for i in range(rows)
+        ])
+
+
+def _run(engine, seconds: float, readers: int, writers: int, rows: int) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"reads": 0, "writes": 0, "locked": 0, "read_latencies": []}
+
+    def reader():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT id, employee_id, from_date, to_date FROM leave_requests "
+                             "WHERE department = :d AND status = 'Pending' ORDER BY from_date"),
+                        {"d": random.choice(DEPARTMENTS)},
+                    ).fetchall()
+            except OperationalError:
+                with lock:
+                    stats["locked"] += 1
+                continue
+            with lock:
+                stats["reads"] += 1
+                stats["read_latencies"].append(time.perf_counter() - started)
+
+    def writer():
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE leave_requests SET status = :s WHERE id = :id"),
+                        {"s": random.choice(["Pending", "Approved"]), "id": random.randint(1, rows)},
+                    )
+            except OperationalError:
+                with lock:
+                    stats["locked"] += 1
+                continue
+            with lock:
+                stats["writes"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(stats["read_latencies"]) or [0.0]
+    return {
+        "reads/s": round(stats["reads"] / seconds),
+        "writes/s": round(stats["writes"] / seconds),
+        "locked errors": stats["locked"],
+        "read p95 ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def _session_ms(url: str, sessions: int) -> dict:
+    """Mean milliseconds per session (open, ``SELECT 1``, close) on the app's engines."""
+    engine = create_app_engine(url)
+    started = time.perf_counter()
+    for _ in range(sessions):
+        with Session(engine) as db:
+            db.execute(text("SELECT 1"))
+    sync_ms = 1000 * (time.perf_counter() - started) / sessions
+    engine.dispose()
+
+    async def run_async() -> float:
+        async_engine = create_app_async_engine(url)
+        started = time.perf_counter()
+        for _ in range(sessions):
+            async with AsyncSession(async_engine) as db:
+                await db.execute(text("SELECT 1"))
+        elapsed = time.perf_counter() - started
+        await async_engine.dispose()
+        return 1000 * elapsed / sessions
+
+    return {"sync session ms": round(sync_ms, 3), "async session ms": round(asyncio.run(run_async()), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, pragmas in [("default", None), ("tuned", sqlite_pragmas())]:
+            path = Path(tmp) / f"{label}.db"
+            # timeout=1 keeps the baseline close to a busy production box where
+            # waiting writers give up quickly; the tuned run uses busy_timeout.
+            engine = create_engine(
+                f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 1}
+            )
+            if pragmas:
+                configure_sqlite(engine, pragmas)
+            _seed(engine, args.rows)
+            results[label] = _run(engine, args.seconds, args.readers, args.writers, args.rows)
+            engine.dispose()
+        session_ms = _session_ms(f"sqlite:///{Path(tmp) / 'tuned.db'}", args.sessions)
+
+    print(f"{'':16}" + "".join(f"{label:>12}" for label in results))
+    for metric in results["default"]:
+        print(f"{metric:16}" + "".join(f"{r[metric]:>12}" for r in results.values()))
+    print()
+    for metric, value in session_ms.items():
+        print(f"{metric:16}{value:>24}")
+
+
+if __name__ == "__main__":
+    main()
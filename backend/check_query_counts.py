@@ -0,0 +1,115 @@
+"""Check that building a dashboard runs a fixed number of statements.
+
+Builds a scratch SQLite database through app.migrations, then counts the
+statements each role's dashboard executes (a cache miss: the config read plus
+every enabled widget) with a before_cursor_execute listener. The counts are
+taken with a one-member team and again after growing the team to TEAM_SIZE
+members, each with leave of their own; the check fails if any count grew,
+which is how a per-member query (N+1) shows up.
+
+    python check_query_counts.py [-v]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+TEAM_SIZE = 25
+DEPARTMENT = "Engineering"
+
+
+def _add_member(db, number: int):
+    from app.models import LeaveRequest, User
+
+    today = date.today()
+    user = User(
+        name=f"Member {number}", email=f"member{number}@example.com", password_hash="x",
+        role="employee", department=DEPARTMENT, skills='["Python"]',
+    )
+    db.add(user)
+    db.flush()
+    db.add_all([
+        LeaveRequest(employee_id=user.id, department=DEPARTMENT, from_date=today, to_date=today,
+                     reason="away", status="Approved"),
+        LeaveRequest(employee_id=user.id, department=DEPARTMENT, from_date=today + timedelta(days=7),
+                     to_date=today + timedelta(days=8), reason="trip", status="Pending"),
+    ])
+    return user
+
+
+def _record_statements(principals: dict) -> dict[str, list[str]]:
+    from sqlalchemy import event
+
+    from app.database import AsyncSessionLocal, async_engine
+    from app.routers.dashboard import _dashboard_config, composer
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    async def build_all() -> None:
+        nonlocal statements
+        for role, principal in principals.items():
+            statements = recorded[role] = []
+            async with AsyncSessionLocal() as db:
+                config = await _dashboard_config(db, principal.id)
+            await composer.compose(principal, config)
+        # Pooled aiosqlite connections belong to this event loop.
+        await async_engine.dispose()
+
+    recorded = {}
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        asyncio.run(build_all())
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return recorded
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv[1:]
+    with tempfile.TemporaryDirectory() as tmp:
+        # app.database binds its engines to DATABASE_URL on import.
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'counts.db'}"
+        from app.database import SessionLocal, engine
+        from app.dependencies import Principal
+        from app.migrations import run_migrations
+        from app.models import User
+
+        run_migrations(engine)
+        with SessionLocal() as db:
+            staff = [
+                User(name=f"The {role}", email=f"{role}@example.com", password_hash="x",
+                     role=role, department=DEPARTMENT)
+                for role in ("manager", "hr")
+            ]
+            db.add_all(staff)
+            first = _add_member(db, 1)
+            db.commit()
+            principals = {user.role: Principal(user.id, user.role, user.department) for user in [first, *staff]}
+
+        small = _record_statements(principals)
+        with SessionLocal() as db:
+            for number in range(2, TEAM_SIZE + 1):
+                _add_member(db, number)
+            db.commit()
+        large = _record_statements(principals)
+        engine.dispose()
+
+    failures = 0
+    for role in principals:
+        failed = len(small[role]) != len(large[role])
+        failures += failed
+        print(f"{'FAIL' if failed else 'ok':4}  {role} dashboard: "
+              f"{len(small[role])} statements with 1 member, {len(large[role])} with {TEAM_SIZE}")
+        if verbose or failed:
+            for statement in large[role]:
+                print(f"        {statement[:160]}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Check that the hot queries are served by an index.
+
+Builds a scratch SQLite database through app.migrations, runs EXPLAIN QUERY
+PLAN for each query below and exits non-zero unless its main table is read by
+an index SEARCH. A SCAN of the table fails, and so does a SCAN ... USING
+INDEX (a walk over the whole index) unless the query is listed in
+ORDERED_INDEX_SCANS. Paged queries must also read rows in index order,
+without a temporary sort, so deep pages cost the same as the first.
+
+    python check_query_plans.py [-v]
+"""
+import re
+import sys
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select, text, tuple_
+
+from app.migrations import run_migrations
+from app.models import Complaint, LeaveBalance, LeaveLedgerEntry, LeaveRequest, User, UserLearningAssignment
+
+HOT_QUERIES = {
+    "/leave/pending": (
+        "leave_requests",
+        select(LeaveRequest).join(User).filter(
+            LeaveRequest.department == "Engineering", LeaveRequest.status == "Pending"
+        ).order_by(LeaveRequest.from_date),
+    ),
+    "/leave/my": (
+        "leave_requests",
+        select(LeaveRequest).filter(LeaveRequest.employee_id == 1).order_by(LeaveRequest.from_date.desc()),
+    ),
+    "paged /leave/my": (
+        "leave_requests",
+        select(LeaveRequest).join(User).filter(
+            LeaveRequest.employee_id == 1,
+            tuple_(LeaveRequest.from_date, LeaveRequest.id) < (date(2025, 6, 1), 500),
+        ).order_by(LeaveRequest.from_date.desc(), LeaveRequest.id.desc()).limit(50),
+    ),
+    "paged /leave/history": (
+        "leave_requests",
+        select(LeaveRequest).join(User).filter(
+            LeaveRequest.department == "Engineering",
+            tuple_(LeaveRequest.from_date, LeaveRequest.id) < (date(2025, 6, 1), 500),
+        ).order_by(LeaveRequest.from_date.desc(), LeaveRequest.id.desc()).limit(50),
+    ),
+    "auto-approval": (
+        "leave_requests",
+        select(LeaveRequest).filter(
+            LeaveRequest.status == "Pending", LeaveRequest.created_at <= datetime(2025, 1, 1)
+        ),
+    ),
+    "export validators": (
+        "leave_requests",
+        select(func.count(), func.max(LeaveRequest.id), func.max(LeaveRequest.updated_at)).filter(
+            LeaveRequest.department == "Engineering"
+        ),
+    ),
+    "leave balance": (
+        "leave_balances",
+        select(LeaveBalance).filter(LeaveBalance.user_id == 1, LeaveBalance.year == 2025),
+    ),
+    "ledger tail": (
+        "leave_ledger",
+        select(LeaveLedgerEntry).filter(
+            LeaveLedgerEntry.user_id == 1, LeaveLedgerEntry.year == 2025, LeaveLedgerEntry.id > 100
+        ),
+    ),
+    "open complaints": (
+        "complaints",
+        select(Complaint).filter(Complaint.status == "Open").order_by(Complaint.created_at.desc()),
+    ),
+    "assigned learning": (
+        "user_learning_assignments",
+        select(UserLearningAssignment).filter(UserLearningAssignment.user_id == 1),
+    ),
+    "team members": (
+        "users",
+        select(User).filter(User.department == "Engineering", User.role == "employee"),
+    ),
+}
+
+# Queries allowed to walk a whole index in order (SCAN t USING INDEX), e.g.
+# an unfiltered listing whose ORDER BY the index serves.
+ORDERED_INDEX_SCANS: set[str] = set()
+
+
+def _explain(conn, statement) -> list[str]:
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv[1:]
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'plans.db'}")
+        run_migrations(engine)
+        with engine.connect() as conn:
+            for name, (table, statement) in HOT_QUERIES.items():
+                plan = _explain(conn, statement)
+                searched = any(
+                    re.match(rf"SEARCH {table} USING (COVERING INDEX|INDEX|INTEGER PRIMARY KEY)", step)
+                    for step in plan
+                )
+                index_scan = rf"SCAN {table} USING (COVERING )?INDEX "
+                scanned = any(
+                    step.startswith(f"SCAN {table}")
+                    and not (name in ORDERED_INDEX_SCANS and re.match(index_scan, step))
+                    for step in plan
+                )
+                needs_sort = name.startswith("paged") and any("TEMP B-TREE" in step for step in plan)
+                failed = scanned or needs_sort or not (searched or name in ORDERED_INDEX_SCANS)
+                failures += failed
+                print(f"{'FAIL' if failed else 'ok':4}  {name}")
+                if verbose or failed:
+                    for step in plan:
+                        print(f"        {step}")
+        engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,85 +1,12 @@
+from sqlalchemy import inspect, text
 from app.database import SessionLocal, engine
-from app.models import Base, User, UserDocument, DashboardConfig, CompliancePolicy, LearningContent, LeaveBalance, UserLearningProgress, UserLearningAssignment
+from app.migrations import run_migrations
+from app.models import User, UserDocument, DashboardConfig, CompliancePolicy, LearningContent, LeaveBalance, LeaveRequest, Payroll, UserLearningProgress, UserLearningAssignment
 from app.auth import get_password_hash
 import json
 from datetime import datetime
 
-Base.metadata.create_all(bind=engine)
-
-# Add new User columns if missing (for existing DBs)
-with engine.connect() as conn:
-    try:
-        r = conn.execute(__import__("sqlalchemy").text("PRAGMA table_info(users)"))
-        cols = [row[1] for row in r.fetchall()]
-    except Exception:
-        cols = []
-    for col, spec in [
-        ("phone", "TEXT"),
-        ("address", "TEXT"),
-        ("manager_id", "INTEGER"),
-        ("interests", "TEXT"),
-        ("certifications", "TEXT"),
-        ("career_preferences", "TEXT"),
-    ]:
-        if col not in cols:
-            try:
-                conn.execute(__import__("sqlalchemy").text(f"ALTER TABLE users ADD COLUMN {col} {spec}"))
-                conn.commit()
-            except Exception:
-                conn.rollback()
-    try:
-        r = conn.execute(__import__("sqlalchemy").text("PRAGMA table_info(dashboard_configs)"))
-        dcols = [row[1] for row in r.fetchall()]
-    except Exception:
-        dcols = []
-    for col in ["show_profile", "show_attendance", "show_payroll", "show_career", "show_wellness"]:
-        if col not in dcols:
-            try:
-                conn.execute(__import__("sqlalchemy").text(f"ALTER TABLE dashboard_configs ADD COLUMN {col} INTEGER DEFAULT 1"))
-                conn.commit()
-            except Exception:
-                conn.rollback()
-    try:
-        r = conn.execute(__import__("sqlalchemy").text("PRAGMA table_info(leave_requests)"))
-        lcols = [row[1] for row in r.fetchall()]
-    except Exception:
-        lcols = []
-    if "created_at" not in lcols:
-        try:
-            conn.execute(__import__("sqlalchemy").text("ALTER TABLE leave_requests ADD COLUMN created_at TEXT"))
-            conn.commit()
-        except Exception:
-            conn.rollback()
-    
-    # Check if payroll table exists, create if not
-    try:
-        r = conn.execute(__import__("sqlalchemy").text("SELECT name FROM sqlite_master WHERE type='table' AND name='payroll'"))
-        table_exists = r.fetchone() is not None
-        if not table_exists:
-            conn.execute(__import__("sqlalchemy").text("""
-                CREATE TABLE payroll (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL UNIQUE,
-                    current_ctc INTEGER NOT NULL,
-                    net_monthly INTEGER NOT NULL,
-                    basic INTEGER NOT NULL,
-                    hra INTEGER NOT NULL,
-                    special_allowance INTEGER NOT NULL,
-                    other_allowances INTEGER DEFAULT 0,
-                    pf INTEGER NOT NULL,
-                    tds INTEGER NOT NULL,
-                    other_deductions INTEGER DEFAULT 0,
-                    financial_year TEXT NOT NULL,
-                    tax_regime TEXT DEFAULT 'Old regime',
-                    updated_at TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """))
-            conn.commit()
-            print("✓ Created payroll table")
-    except Exception as e:
-        print(f"Note: Could not create payroll table: {e}")
-        conn.rollback()
+run_migrations(engine)
 
 db = SessionLocal()
 
@@ -197,58 +124,28 @@ try:
                 u.manager_id = mid
             db.commit()
     
-    # Old policies - update them with categories
-    # Use raw SQL to update since SQLAlchemy might not see the column if it was added via migration
-    from sqlalchemy import text
-    try:
-        # Update old policies that don't have categories
-        conn = db.connection()
-        try:
-            result = conn.execute(text("""
-                UPDATE compliance_policies 
-                SET category = CASE 
-                    WHEN title LIKE '%Privacy%' OR title LIKE '%Data%' THEN 'IT Security Policy'
-                    WHEN title LIKE '%Code%' OR title LIKE '%Review%' THEN 'IT Security Policy'
-                    WHEN title LIKE '%Sales%' OR title LIKE '%Ethics%' THEN 'HR Compliance'
-                    ELSE 'General Compliance'
-                END
-                WHERE category IS NULL
-            """))
-            conn.commit()
-            print(f"✓ Updated {result.rowcount} old policies with categories")
-            
-            # Also ensure rules field exists for all policies
-            result2 = conn.execute(text("""
-                UPDATE compliance_policies 
-                SET rules = '[]'
-                WHERE rules IS NULL
-            """))
-            conn.commit()
-            if result2.rowcount > 0:
-                print(f"✓ Updated {result2.rowcount} policies with empty rules array")
-        finally:
-            conn.close()
-    except Exception as e:
-        print(f"Note: Could not update old policies via SQL: {e}")
-        # Fallback: try ORM approach
-        all_policies = db.query(CompliancePolicy).all()
-        for old_policy in all_policies:
-            category = getattr(old_policy, 'category', None)
-            if not category:
-                title_lower = old_policy.title.lower()
-                if "privacy" in title_lower or "data" in title_lower:
-                    old_policy.category = "IT Security Policy"
-                elif "code" in title_lower or "review" in title_lower:
-                    old_policy.category = "IT Security Policy"
-                elif "sales" in title_lower or "ethics" in title_lower:
-                    old_policy.category = "HR Compliance"
-                else:
-                    old_policy.category = "General Compliance"
-                
-                if not getattr(old_policy, 'rules', None):
-                    old_policy.rules = "[]"
-                
-                db.add(old_policy)
+    # Old policies - update them with categories. Only databases created by an
+    # earlier schema have these columns, so check before touching them.
+    policy_cols = {c["name"] for c in inspect(db.connection()).get_columns("compliance_policies")}
+    if {"category", "rules"} <= policy_cols:
+        result = db.execute(text("""
+            UPDATE compliance_policies 
+            SET category = CASE 
+                WHEN title LIKE '%Privacy%' OR title LIKE '%Data%' THEN 'IT Security Policy'
+                WHEN title LIKE '%Code%' OR title LIKE '%Review%' THEN 'IT Security Policy'
+                WHEN title LIKE '%Sales%' OR title LIKE '%Ethics%' THEN 'HR Compliance'
+                ELSE 'General Compliance'
+            END
+            WHERE category IS NULL
+        """))
+        print(f"✓ Updated {result.rowcount} old policies with categories")
+        result2 = db.execute(text("""
+            UPDATE compliance_policies 
+            SET rules = '[]'
+            WHERE rules IS NULL
+        """))
+        if result2.rowcount > 0:
+            print(f"✓ Updated {result2.rowcount} policies with empty rules array")
         db.commit()
     
     learning_content = [
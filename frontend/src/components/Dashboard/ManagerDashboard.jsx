@@ -83,13 +83,16 @@ const ManagerDashboard = () => {
     }
     
     try {
-      await api.post('/leave/bulk-approve', {
+      const response = await api.post('/leave/bulk-approve', {
         leave_ids: selectedLeaves,
         status: status
       });
       loadDashboard();
       setSelectedLeaves([]);
-      alert(`Successfully ${status.toLowerCase()} ${selectedLeaves.length} leave request(s)`);
+      const { updated_count: updated, results = [] } = response.data;
+      const skipped = results.length - updated;
+      alert(`Successfully ${status.toLowerCase()} ${updated} leave request(s)` +
+        (skipped > 0 ? `; ${skipped} skipped (already processed or not found)` : ''));
     } catch (error) {
       console.error('Failed to bulk update:', error);
       alert(error.response?.data?.detail || 'Failed to bulk update leaves');